@@ -23,3 +23,7 @@ class AddressAlreadyInUse(BaseException):
 
 class ExternalServiceError(BaseException):
     """An external service error occurred with HTTP 50X."""
+
+
+class RegistryClientError(BaseException):
+    """The container registry couldn't be queried directly through its HTTP API."""
@@ -0,0 +1,39 @@
+"""Add an index on build_tag.name.
+
+Revision ID: b8f1c2d3e4a5
+Revises: 1920ad83d0ab
+Create Date: 2026-10-15 10:12:41.281735
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8f1c2d3e4a5'
+down_revision = '1920ad83d0ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY can't run in a transaction, but it doesn't block the inserts
+        # of new build tags while the index is being built
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_build_tag_name',
+                'build_tag',
+                ['name'],
+                unique=False,
+                postgresql_concurrently=True,
+            )
+    else:
+        op.create_index('ix_build_tag_name', 'build_tag', ['name'], unique=False)
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_build_tag_name', 'build_tag', postgresql_concurrently=True)
+    else:
+        op.drop_index('ix_build_tag_name', 'build_tag')
@@ -327,7 +327,7 @@ class BuildTag(db.Model):
     """Extra tag associated with built index image."""
 
     id: Mapped[int] = db.mapped_column(primary_key=True)
-    name: Mapped[str] = db.mapped_column(unique=False)
+    name: Mapped[str] = db.mapped_column(unique=False, index=True)
 
 
 class RequestBuildTag(db.Model):
@@ -41,13 +41,19 @@ class Config(object):
         "opm_pprof_port": (50151, 50251),
     }
     iib_opm_pprof_lock_required_min_version = "1.29.0"
+    # maximum age of the dangling container images kept on the host when iib_preserve_cache is set
+    iib_image_cache_max_age: str = '24h'
     iib_image_push_template: str = '{registry}/iib-build:{request_id}'
     iib_index_image_output_registry: Optional[str] = None
     iib_log_level: str = 'INFO'
+    # maximum number of index image architectures which are built and pushed concurrently
+    iib_max_parallel_arch_builds: int = 4
     iib_max_recursive_related_bundles = 15
     # list of index images to which we can add bundles without "com.redhat.openshift.versions" label
     iib_no_ocp_label_allow_list: List[str] = []
     iib_organization_customizations: iib_organization_customizations_type = {}
+    # keep the container images between requests so that the build cache can be reused
+    iib_preserve_cache: bool = False
     iib_sac_queues: List[str] = []
     iib_request_logs_dir: Optional[str] = None
     iib_request_logs_format: str = (
@@ -57,13 +63,21 @@ class Config(object):
     iib_request_logs_level: str = 'DEBUG'
     iib_required_labels: Dict[str, str] = {}
     iib_request_related_bundles_dir: Optional[str] = None
+    # The directory to create the temporary build directories of index images in, e.g. a tmpfs
+    iib_tmpfs_dir: Optional[str] = None
     # Configuration for dogpile.cache
     # Disabled by default (by using 'dogpile.cache.null').
     # To enable caching set 'dogpile.cache.memcached' as backend.
     iib_dogpile_backend: str = 'dogpile.cache.null'
     iib_dogpile_expiration_time: int = 600
     iib_dogpile_arguments: Dict[str, List[str]] = {'url': ['127.0.0.1']}
+    # Number of cached values also kept in memory of the worker process, 0 disables it
+    iib_dogpile_local_cache_size: int = 1024
     iib_skopeo_timeout: str = '300s'
+    # The gzip compression level of the pushed index image layers, None for the skopeo default
+    iib_push_compression_level: Optional[int] = None
+    # Query the registry API directly instead of running skopeo for raw manifests and configs
+    iib_use_registry_client: bool = False
     iib_total_attempts: int = 5
     iib_retry_delay: int = 10
     iib_retry_jitter: int = 10
@@ -249,6 +263,7 @@ class TestingConfig(DevelopmentConfig):
     iib_request_related_bundles_dir: Optional[str] = None
     # disable dogpile cache for tests
     iib_dogpile_backend: str = 'dogpile.cache.null'
+    iib_dogpile_local_cache_size: int = 0
 
 
 def configure_celery(celery_app: Celery) -> None:
@@ -311,6 +326,18 @@ def validate_celery_config(conf: app.utils.Settings, **kwargs) -> None:
         if any(not index for index in conf['iib_no_ocp_label_allow_list']):
             raise ConfigError('Empty string is not allowed in iib_no_ocp_label_allow_list')
 
+    max_parallel_arch_builds = conf.get('iib_max_parallel_arch_builds')
+    if max_parallel_arch_builds is not None and (
+        not isinstance(max_parallel_arch_builds, int) or max_parallel_arch_builds < 1
+    ):
+        raise ConfigError('iib_max_parallel_arch_builds must be a positive integer')
+
+    push_compression_level = conf.get('iib_push_compression_level')
+    if push_compression_level is not None and (
+        not isinstance(push_compression_level, int) or not 1 <= push_compression_level <= 9
+    ):
+        raise ConfigError('iib_push_compression_level must be an integer between 1 and 9')
+
     _validate_multiple_opm_mapping(conf['iib_ocp_opm_mapping'])
     _validate_iib_org_customizations(conf['iib_organization_customizations'])
 
@@ -352,6 +379,7 @@ def validate_celery_config(conf: app.utils.Settings, **kwargs) -> None:
         'iib_request_logs_dir',
         'iib_request_related_bundles_dir',
         'iib_request_recursive_related_bundles_dir',
+        'iib_tmpfs_dir',
     ):
         iib_request_temp_data_dir = conf.get(directory)
         if iib_request_temp_data_dir:
@@ -1,7 +1,10 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
+from collections import OrderedDict
+import copy
 import functools
 import hashlib
-from typing import Callable
+import threading
+from typing import Any, Callable
 
 from dogpile.cache import make_region
 from dogpile.cache.region import CacheRegion
@@ -14,33 +17,71 @@ def skopeo_inspect_should_use_cache(*args, **kwargs) -> bool:
     return any(arg.find('@sha256:') != -1 for arg in args)
 
 
-def dogpile_cache(dogpile_region: CacheRegion, should_use_cache_fn: Callable) -> Callable:
+def dogpile_cache(
+    dogpile_region: CacheRegion, should_use_cache_fn: Callable, local_cache_size: int = 0
+) -> Callable:
     """
     Dogpile cache decorator.
 
+    If ``local_cache_size`` is set, the cached values are also kept in a least recently used
+    in-process cache, so that repeated calls don't need to reach the dogpile backend. The
+    decorated function gets a ``cache_clear`` method to empty the in-process cache.
+
     :params dogpile_region: Dogpile CacheRegion object
     :params should_use_cache_fn: function which determines if cache should be used
+    :params local_cache_size: maximum number of values kept in the in-process cache
     """
 
     def cache_decorator(func):
+        local_cache: OrderedDict = OrderedDict()
+        local_cache_lock = threading.Lock()
+
+        def get_local(cache_key: str) -> Any:
+            with local_cache_lock:
+                if cache_key not in local_cache:
+                    return None
+                local_cache.move_to_end(cache_key)
+                # Copy the value so that the callers can't modify the cached data
+                return copy.deepcopy(local_cache[cache_key])
+
+        def set_local(cache_key: str, value: Any) -> None:
+            if not local_cache_size:
+                return
+            with local_cache_lock:
+                local_cache[cache_key] = copy.deepcopy(value)
+                local_cache.move_to_end(cache_key)
+                while len(local_cache) > local_cache_size:
+                    local_cache.popitem(last=False)
+
+        def cache_clear() -> None:
+            with local_cache_lock:
+                local_cache.clear()
+
         @functools.wraps(func)
         def inner(*args, **kwargs):
             should_cache = should_use_cache_fn(*args, **kwargs)
             cache_key = generate_cache_key(func.__name__, *args, **kwargs)
 
             if should_cache:
+                output_local = get_local(cache_key)
+                if output_local:
+                    return output_local
+
                 # get data from cache
                 output_cache = dogpile_region.get(cache_key)
                 if output_cache:
+                    set_local(cache_key, output_cache)
                     return output_cache
 
             output = func(*args, **kwargs)
 
             if should_cache:
                 dogpile_region.set(cache_key, output)
+                set_local(cache_key, output)
 
             return output
 
+        inner.cache_clear = cache_clear
         return inner
 
     return cache_decorator
@@ -0,0 +1,348 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from iib.exceptions import RegistryClientError
+from iib.workers.config import get_worker_config
+
+# The same manifest types skopeo accepts, so that tags are resolved to the same manifests
+MANIFEST_MEDIA_TYPES = (
+    'application/vnd.oci.image.manifest.v1+json',
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.docker.distribution.manifest.v1+prettyjws',
+    'application/vnd.docker.distribution.manifest.v1+json',
+)
+
+# The maximum number of connections kept open to a registry, enough for get_images_labels to
+# inspect the images concurrently with its default number of threads
+_MAX_CONNECTIONS_PER_REGISTRY = 16
+# The lifetime of a bearer token when the registry doesn't specify it, see
+# https://distribution.github.io/distribution/spec/auth/token/
+_DEFAULT_TOKEN_EXPIRES_IN = 60
+# Tokens are refreshed shortly before they expire, so that they don't expire in flight
+_TOKEN_EXPIRY_MARGIN = 10
+
+_DURATION_UNITS = {'h': 3600, 'm': 60, 's': 1, 'ms': 1e-3, 'us': 1e-6, 'µs': 1e-6, 'ns': 1e-9}
+_DURATION_PART_RE = re.compile(r'(\d+(?:\.\d+)?)(h|ms|m|s|us|µs|ns)')
+_DURATION_RE = re.compile(rf'(?:{_DURATION_PART_RE.pattern})+')
+
+
+class RegistryClient:
+    """
+    Minimal client of the Docker Registry HTTP API V2.
+
+    Unlike ``skopeo inspect``, the client doesn't spawn a new process for every call and it reuses
+    the connections and the bearer tokens between calls. Only the token and the basic
+    authentication schemes are supported, with the credentials stored in the Docker
+    ``config.json``. Anything else raises ``RegistryClientError`` so that the caller can fall back
+    to skopeo.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        """
+        Initialize the client.
+
+        :param float timeout: the timeout in seconds of the HTTP requests to the registries; if not
+            set, ``iib_skopeo_timeout`` is used, like for the skopeo commands the client replaces
+        """
+        self._timeout = timeout
+        # The session is shared by all the threads, so that the connections are reused even when
+        # the calls are made from short-lived thread pools. The connection pools of urllib3 are
+        # thread-safe.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=_MAX_CONNECTIONS_PER_REGISTRY)
+        self.session.mount('https://', adapter)
+        # Maps (registry, repository, credentials) to the bearer token and the time it expires at
+        self._tokens: Dict[Tuple[str, str, Optional[str]], Tuple[str, float]] = {}
+        self._tokens_lock = threading.Lock()
+
+    @property
+    def timeout(self) -> float:
+        """
+        Get the timeout in seconds of the HTTP requests to the registries.
+
+        :return: the timeout in seconds
+        :rtype: float
+        :raises RegistryClientError: if ``iib_skopeo_timeout`` is not a valid duration
+        """
+        if self._timeout is not None:
+            return self._timeout
+        return _parse_duration(get_worker_config().iib_skopeo_timeout)
+
+    def get_manifest(self, pull_spec: str) -> str:
+        """
+        Get the raw manifest of the container image, as returned by ``skopeo inspect --raw``.
+
+        :param str pull_spec: the pull specification of the container image
+        :return: the raw manifest
+        :rtype: str
+        :raises RegistryClientError: if the manifest can't be retrieved
+        """
+        registry, repository, reference = _parse_pull_spec(pull_spec)
+        response = self._get(
+            registry,
+            repository,
+            f'manifests/{reference}',
+            {'Accept': ', '.join(MANIFEST_MEDIA_TYPES)},
+        )
+        # Decode the content as is, since the digest is computed from the raw manifest
+        return response.content.decode('utf-8')
+
+    def get_config(self, pull_spec: str) -> str:
+        """
+        Get the config of the container image, as returned by ``skopeo inspect --config``.
+
+        :param str pull_spec: the pull specification of a single arch container image
+        :return: the raw config
+        :rtype: str
+        :raises RegistryClientError: if the config can't be retrieved or the pull specification
+            doesn't refer to a single arch v2 image manifest
+        """
+        try:
+            manifest = json.loads(self.get_manifest(pull_spec))
+        except ValueError:
+            raise RegistryClientError(f'The manifest of {pull_spec} is not valid JSON')
+
+        config = manifest.get('config') if isinstance(manifest, dict) else None
+        config_digest = config.get('digest') if isinstance(config, dict) else None
+        if not config_digest or manifest.get('schemaVersion') != 2:
+            raise RegistryClientError(f'{pull_spec} is not a single arch v2 image manifest')
+
+        return self.get_blob(pull_spec, config_digest)
+
+    def get_blob(self, pull_spec: str, digest: str) -> str:
+        """
+        Get the blob, such as the image config, from the repository of the container image.
+
+        :param str pull_spec: the pull specification of a container image in the repository
+        :param str digest: the digest of the blob
+        :return: the content of the blob
+        :rtype: str
+        :raises RegistryClientError: if the blob can't be retrieved
+        """
+        registry, repository, _ = _parse_pull_spec(pull_spec)
+        response = self._get(registry, repository, f'blobs/{digest}')
+        return response.content.decode('utf-8')
+
+    def _get(
+        self,
+        registry: str,
+        repository: str,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> requests.Response:
+        """
+        Send an authenticated GET request to the registry API of the repository.
+
+        :param str registry: the registry to send the request to
+        :param str repository: the repository in the registry
+        :param str path: the path of the API endpoint relative to the repository
+        :param dict headers: additional headers of the request
+        :return: the successful response
+        :rtype: requests.Response
+        :raises RegistryClientError: if the request fails
+        """
+        url = f'https://{_get_registry_host(registry)}/v2/{repository}/{path}'
+        headers = dict(headers or {})
+        credentials = _get_registry_credentials(registry)
+        token = self._get_token(registry, repository, credentials)
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 401:
+                headers['Authorization'] = self._authenticate(
+                    registry, repository, credentials, response.headers.get('WWW-Authenticate', '')
+                )
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise RegistryClientError(f'The connection to {registry} failed: {e}')
+
+        if not response.ok:
+            raise RegistryClientError(
+                f'The request to {url} failed with the status {response.status_code}'
+            )
+        return response
+
+    def _authenticate(
+        self,
+        registry: str,
+        repository: str,
+        credentials: Optional[str],
+        challenge: str,
+    ) -> str:
+        """
+        Get the value of the ``Authorization`` header which satisfies the registry challenge.
+
+        :param str registry: the registry which sent the challenge
+        :param str repository: the repository in the registry to get the pull access to
+        :param str credentials: the base64 encoded ``username:password`` for the registry
+        :param str challenge: the value of the ``WWW-Authenticate`` header sent by the registry
+        :return: the value of the ``Authorization`` header
+        :rtype: str
+        :raises RegistryClientError: if the authentication scheme isn't supported or the
+            authentication fails
+        """
+        scheme, _, params_str = challenge.partition(' ')
+        if scheme.lower() == 'basic' and credentials:
+            return f'Basic {credentials}'
+        if scheme.lower() != 'bearer':
+            raise RegistryClientError(f'Unsupported authentication scheme on {registry}: {scheme}')
+
+        params = dict(re.findall(r'(\w+)="([^"]*)"', params_str))
+        if not params.get('realm'):
+            raise RegistryClientError(f'The authentication challenge of {registry} has no realm')
+
+        query = {'scope': f'repository:{repository}:pull'}
+        if params.get('service'):
+            query['service'] = params['service']
+        headers = {'Authorization': f'Basic {credentials}'} if credentials else {}
+        try:
+            response = self.session.get(
+                params['realm'], params=query, headers=headers, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise RegistryClientError(f'The authentication to {registry} failed: {e}')
+
+        if not response.ok:
+            raise RegistryClientError(
+                f'The authentication to {registry} failed with the status {response.status_code}'
+            )
+        try:
+            rv = response.json()
+        except ValueError:
+            raise RegistryClientError(f'The authentication to {registry} returned invalid JSON')
+
+        token = (rv.get('token') or rv.get('access_token')) if isinstance(rv, dict) else None
+        if not token or not isinstance(token, str):
+            raise RegistryClientError(f'The authentication to {registry} returned no token')
+
+        expires_in = rv.get('expires_in')
+        if not isinstance(expires_in, int) or expires_in <= 0:
+            expires_in = _DEFAULT_TOKEN_EXPIRES_IN
+        now = time.monotonic()
+        with self._tokens_lock:
+            # Drop the expired tokens, so that the cache doesn't grow for the life of the worker
+            for key, (_, expires_at) in list(self._tokens.items()):
+                if expires_at <= now:
+                    del self._tokens[key]
+            self._tokens[(registry, repository, credentials)] = (
+                token,
+                now + expires_in - _TOKEN_EXPIRY_MARGIN,
+            )
+        return f'Bearer {token}'
+
+    def _get_token(
+        self, registry: str, repository: str, credentials: Optional[str]
+    ) -> Optional[str]:
+        """
+        Get the cached bearer token for the repository if it hasn't expired yet.
+
+        :param str registry: the registry the token was issued for
+        :param str repository: the repository in the registry the token grants the access to
+        :param str credentials: the base64 encoded ``username:password`` the token was issued for
+        :return: the bearer token or ``None`` if there is no valid token cached
+        :rtype: str or None
+        """
+        with self._tokens_lock:
+            token, expires_at = self._tokens.get((registry, repository, credentials), (None, 0.0))
+        if token and expires_at > time.monotonic():
+            return token
+        return None
+
+
+def _parse_duration(duration: str) -> float:
+    """
+    Parse a duration in the format accepted by skopeo's ``--command-timeout`` (e.g. ``300s``).
+
+    :param str duration: the duration as a sequence of numbers with a unit (``h``, ``m``, ``s``,
+        ``ms``, ``us`` or ``ns``), such as ``1m30s``
+    :return: the duration in seconds
+    :rtype: float
+    :raises RegistryClientError: if the duration is not valid
+    """
+    if not _DURATION_RE.fullmatch(duration):
+        raise RegistryClientError(f'The duration {duration!r} is not valid')
+
+    return sum(
+        float(value) * _DURATION_UNITS[unit] for value, unit in _DURATION_PART_RE.findall(duration)
+    )
+
+
+def _parse_pull_spec(pull_spec: str) -> Tuple[str, str, str]:
+    """
+    Split the pull specification into the registry, the repository and the reference.
+
+    :param str pull_spec: the pull specification, optionally prefixed with ``docker://``
+    :return: the registry, the repository and the tag or digest
+    :rtype: tuple
+    :raises RegistryClientError: if the pull specification doesn't contain the registry
+    """
+    if pull_spec.startswith('docker://'):
+        pull_spec = pull_spec.split('docker://', 1)[1]
+
+    if '@' in pull_spec:
+        name, reference = pull_spec.split('@', 1)
+    elif ':' in pull_spec.rsplit('/', 1)[-1]:
+        name, reference = pull_spec.rsplit(':', 1)
+    else:
+        name, reference = pull_spec, 'latest'
+
+    registry, _, repository = name.partition('/')
+    # Short names need to be resolved with the registries configuration, leave that to skopeo
+    if not repository or not ('.' in registry or ':' in registry or registry == 'localhost'):
+        raise RegistryClientError(f'The registry of {pull_spec} is not known')
+
+    if registry == 'docker.io' and '/' not in repository:
+        repository = f'library/{repository}'
+    return registry, repository, reference
+
+
+def _get_registry_host(registry: str) -> str:
+    """
+    Get the host serving the registry API.
+
+    :param str registry: the registry from the pull specification
+    :return: the host of the registry API
+    :rtype: str
+    """
+    if registry == 'docker.io':
+        return 'registry-1.docker.io'
+    return registry
+
+
+def _get_registry_credentials(registry: str) -> Optional[str]:
+    """
+    Get the credentials of the registry from the Docker ``config.json``.
+
+    The file is read every time, because the credentials can be changed by
+    ``set_registry_token`` during the request.
+
+    :param str registry: the registry to get the credentials for
+    :return: the base64 encoded ``username:password`` or ``None`` if there are no credentials
+    :rtype: str
+    """
+    docker_config_path = os.path.join(os.path.expanduser('~'), '.docker', 'config.json')
+    try:
+        with open(docker_config_path, 'r') as f:
+            auths = json.load(f).get('auths', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    for key in (registry, f'https://{registry}', f'https://{registry}/v1/'):
+        if auths.get(key, {}).get('auth'):
+            return auths[key]['auth']
+    return None
+
+
+registry_client = RegistryClient()
@@ -1,4 +1,5 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 import os
 import shutil
@@ -42,7 +43,7 @@ from iib.workers.tasks.utils import (
     chmod_recursively,
     get_bundles_from_deprecation_list,
     get_bundle_json,
-    get_resolved_bundles,
+    get_resolved_bundles_mapping,
     get_resolved_image,
     podman_pull,
     request_logger,
@@ -106,11 +107,14 @@ def _build_image(dockerfile_dir: str, dockerfile_name: str, request_id: int, arc
     #
     # NOTE: The argument "--format docker" ensures buildah will not generate an index image with
     # default OCI v1 manifest but always use Docker v2 format.
+    #
+    # NOTE: The base image is always referenced by its digest, so it's safe to reuse the cached
+    # layers of previous builds.
     run_cmd(
         [
             'buildah',
             'bud',
-            '--no-cache',
+            '--layers',
             '--format',
             'docker',
             '--override-arch',
@@ -144,24 +148,170 @@ def _build_image(dockerfile_dir: str, dockerfile_name: str, request_id: int, arc
         )
 
 
-def _cleanup() -> None:
+def _build_and_push_image(
+    dockerfile_dir: str, dockerfile_name: str, request_id: int, arch: str
+) -> None:
+    """
+    Build the index image for the specified architecture and push it to the configured registry.
+
+    :param str dockerfile_dir: the path to the directory containing the data used for
+        building the container image
+    :param str dockerfile_name: the name of the Dockerfile in the dockerfile_dir to
+        be used when building the container image
+    :param int request_id: the ID of the IIB build request
+    :param str arch: the architecture to build this image for
+    :raises IIBError: if the build or the push fails
     """
-    Remove all existing container images on the host.
+    _build_image(dockerfile_dir, dockerfile_name, request_id, arch)
+    _push_image(request_id, arch)
+
+
+def _build_and_push_arches(
+    dockerfile_dir: str, dockerfile_name: str, request_id: int, arches: Set[str]
+) -> None:
+    """
+    Build and push the index image for all the requested architectures concurrently.
+
+    Every architecture is built and pushed under its own tag, so the builds don't share any state.
+    The number of concurrent builds is limited by ``iib_max_parallel_arch_builds``.
+
+    :param str dockerfile_dir: the path to the directory containing the data used for
+        building the container images
+    :param str dockerfile_name: the name of the Dockerfile in the dockerfile_dir to
+        be used when building the container images
+    :param int request_id: the ID of the IIB build request
+    :param set arches: the set of arches to build the index image for
+    :raises IIBError: if any of the builds or pushes fails
+    """
+    max_workers = max(1, min(len(arches), worker_config['iib_max_parallel_arch_builds']))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = []
+    try:
+        for arch in sorted(arches):
+            futures.append(
+                executor.submit(
+                    _build_and_push_image, dockerfile_dir, dockerfile_name, request_id, arch
+                )
+            )
+        for future in as_completed(futures):
+            # Raise the first failure right away, the builds which haven't started yet are
+            # cancelled below
+            future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _push_manifest_list_and_update_request(
+    request_id: int,
+    arches: Set[str],
+    build_tags: Optional[List[str]] = None,
+    from_index: Optional[str] = None,
+    overwrite_from_index: bool = False,
+    overwrite_from_index_token: Optional[str] = None,
+    from_index_resolved: Optional[str] = None,
+) -> None:
+    """
+    Push the manifest list of the index image and set it on the ``add`` or ``rm`` request.
+
+    The index image must already be pushed for all the arches.
+
+    :param int request_id: the ID of the IIB build request
+    :param set arches: the set of arches the index image was built for
+    :param list build_tags: list of extra tags to apply to the index image
+    :param str from_index: the pull specification of the container image containing the index that
+        the index image build was based from.
+    :param bool overwrite_from_index: if True, overwrite the input ``from_index`` with the built
+        index image.
+    :param str overwrite_from_index_token: the token used for overwriting the input
+        ``from_index`` image.
+    :param str from_index_resolved: resolved index image before starting the build.
+    :raises IIBError: if the manifest list couldn't be created and pushed or the request couldn't
+        be updated
+    """
+    set_request_state(request_id, 'in_progress', 'Creating the manifest list')
+    output_pull_spec = _create_and_push_manifest_list(request_id, arches, build_tags)
+
+    _update_index_image_pull_spec(
+        output_pull_spec,
+        request_id,
+        arches,
+        from_index,
+        overwrite_from_index,
+        overwrite_from_index_token,
+        from_index_resolved,
+        add_or_rm=True,
+    )
+
+
+def _cleanup(request_id: Optional[int] = None) -> None:
+    """
+    Remove the existing container images on the host.
 
     This will ensure that the host will not run out of disk space due to stale data, and that
     all images referenced using floating tags will be up to date on the host.
 
+    If ``iib_preserve_cache`` is set, only the images built for the request and the dangling images
+    older than ``iib_image_cache_max_age`` are removed, so that the base images and cached layers
+    can be reused by the following builds. The pulled images are kept even if they are old, since
+    the ``until`` filter of podman compares the time the image was built, not the time it was
+    pulled.
+
     Additionally, this function will reset the Docker ``config.json`` to
     ``iib_docker_config_template``.
 
+    :param int request_id: the ID of the IIB build request whose images should be removed
     :raises IIBError: if the command to remove the container images fails
     """
-    log.info('Removing all existing container images')
+    conf = get_worker_config()
+    if conf['iib_preserve_cache']:
+        if request_id is not None:
+            _remove_request_images(request_id)
+        max_age = conf['iib_image_cache_max_age']
+        log.info('Removing dangling container images older than %s', max_age)
+        run_cmd(
+            ['podman', 'image', 'prune', '--force', '--filter', f'until={max_age}'],
+            exc_msg='Failed to remove the stale container images',
+        )
+    else:
+        log.info('Removing all existing container images')
+        run_cmd(
+            ['podman', 'rmi', '--all', '--force'],
+            exc_msg='Failed to remove the existing container images',
+        )
+    reset_docker_config()
+
+
+def _remove_request_images(request_id: int) -> None:
+    """
+    Remove the container images built on the host for the IIB build request.
+
+    :param int request_id: the ID of the IIB build request
+    :raises IIBError: if the command to list or to remove the container images fails
+    """
+    images = run_cmd(
+        ['podman', 'images', '--format', '{{.Repository}}:{{.Tag}}'],
+        exc_msg='Failed to list the existing container images',
+    )
+    # The images are tagged as localhost/iib-build:<request_id>-<arch>, see _get_local_pull_spec
+    request_images_prefix = f'iib-build:{request_id}-'
+    request_images = sorted(
+        {
+            image
+            for image in images.split()
+            if image.split('/')[-1].startswith(request_images_prefix)
+        }
+    )
+    if not request_images:
+        log.debug('No container images were built for the request %d', request_id)
+        return
+
+    log.info('Removing the container images of the request %d: %s', request_id, request_images)
     run_cmd(
-        ['podman', 'rmi', '--all', '--force'],
-        exc_msg='Failed to remove the existing container images',
+        ['podman', 'rmi', '--force'] + request_images,
+        exc_msg=f'Failed to remove the container images of the request {request_id}',
     )
-    reset_docker_config()
 
 
 @retry(
@@ -191,39 +341,40 @@ def _create_and_push_manifest_list(
     if build_tags:
         _tags.extend(build_tags)
     conf = get_worker_config()
-    output_pull_specs = []
-    for tag in _tags:
-        output_pull_spec = conf['iib_image_push_template'].format(
-            registry=conf['iib_registry'], request_id=tag
+    rebuilt_pull_spec = get_rebuilt_image_pull_spec(request_id)
+    arch_pull_specs = [
+        _get_arch_pull_spec(rebuilt_pull_spec, arch, include_transport=True)
+        for arch in sorted(arches)
+    ]
+    output_pull_specs = [
+        conf['iib_image_push_template'].format(registry=conf['iib_registry'], request_id=tag)
+        for tag in _tags
+    ]
+    # The manifest list is the same for every tag, so it's only created once from the production
+    # tag and then pushed to all the tags
+    manifest_list = output_pull_specs[0]
+    try:
+        run_cmd(
+            buildah_manifest_cmd + ['rm', manifest_list],
+            exc_msg=f'Failed to remove local manifest list. {manifest_list} does not exist',
         )
-        output_pull_specs.append(output_pull_spec)
-        try:
-            run_cmd(
-                buildah_manifest_cmd + ['rm', output_pull_spec],
-                exc_msg=f'Failed to remove local manifest list. {output_pull_spec} does not exist',
-            )
-        except IIBError as e:
-            error_msg = str(e)
-            if 'Manifest list not found locally.' not in error_msg:
-                raise IIBError(f'Error removing local manifest list: {error_msg}')
-            log.debug(
-                'Manifest list cannot be removed. No manifest list %s found', output_pull_spec
-            )
-        log.info('Creating the manifest list %s locally', output_pull_spec)
+    except IIBError as e:
+        error_msg = str(e)
+        if 'Manifest list not found locally.' not in error_msg:
+            raise IIBError(f'Error removing local manifest list: {error_msg}')
+        log.debug('Manifest list cannot be removed. No manifest list %s found', manifest_list)
+    log.info('Creating the manifest list %s locally', manifest_list)
+    run_cmd(
+        buildah_manifest_cmd + ['create', manifest_list],
+        exc_msg=f'Failed to create the manifest list locally: {manifest_list}',
+    )
+    for arch_pull_spec in arch_pull_specs:
         run_cmd(
-            buildah_manifest_cmd + ['create', output_pull_spec],
-            exc_msg=f'Failed to create the manifest list locally: {output_pull_spec}',
+            buildah_manifest_cmd + ['add', manifest_list, arch_pull_spec],
+            exc_msg=f'Failed to add {arch_pull_spec} to the local manifest list: {manifest_list}',
         )
-        for arch in sorted(arches):
-            arch_pull_spec = _get_external_arch_pull_spec(request_id, arch, include_transport=True)
-            run_cmd(
-                buildah_manifest_cmd + ['add', output_pull_spec, arch_pull_spec],
-                exc_msg=(
-                    f'Failed to add {arch_pull_spec} to the'
-                    f' local manifest list: {output_pull_spec}'
-                ),
-            )
 
+    for output_pull_spec in output_pull_specs:
         log.debug('Pushing manifest list %s', output_pull_spec)
         run_cmd(
             buildah_manifest_cmd
@@ -232,7 +383,7 @@ def _create_and_push_manifest_list(
                 '--all',
                 '--format',
                 'v2s2',
-                output_pull_spec,
+                manifest_list,
                 f'docker://{output_pull_spec}',
             ],
             exc_msg=f'Failed to push the manifest list to {output_pull_spec}',
@@ -299,10 +450,19 @@ def _update_index_image_pull_spec(
 
     if add_or_rm:
         with set_registry_token(overwrite_from_index_token, from_index, append=True):
-            index_image_resolved = get_resolved_image(index_image)
+            if index_image == output_pull_spec:
+                index_image_resolved = get_resolved_image(index_image)
+                output_pull_spec_resolved = index_image_resolved
+            else:
+                # The lookups don't depend on each other, so the registry round-trips can overlap
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    index_image_future = executor.submit(get_resolved_image, index_image)
+                    output_pull_spec_future = executor.submit(get_resolved_image, output_pull_spec)
+                    index_image_resolved = index_image_future.result()
+                    output_pull_spec_resolved = output_pull_spec_future.result()
         payload['index_image_resolved'] = index_image_resolved
         payload['internal_index_image_copy'] = output_pull_spec
-        payload['internal_index_image_copy_resolved'] = get_resolved_image(output_pull_spec)
+        payload['internal_index_image_copy_resolved'] = output_pull_spec_resolved
 
     update_request(request_id, payload, exc_msg='Failed setting the index image on the request')
 
@@ -322,7 +482,27 @@ def _get_external_arch_pull_spec(
     :return: the pull specification of the single arch image in the external registry
     :rtype: str
     """
-    pull_spec = get_rebuilt_image_pull_spec(request_id) + f'-{arch}'
+    return _get_arch_pull_spec(
+        get_rebuilt_image_pull_spec(request_id), arch, include_transport=include_transport
+    )
+
+
+def _get_arch_pull_spec(
+    rebuilt_pull_spec: str,
+    arch: str,
+    include_transport: bool = False,
+) -> str:
+    """
+    Get the pull specification of the single arch image from the rebuilt image pull specification.
+
+    :param str rebuilt_pull_spec: the pull specification of the container image rebuilt by IIB
+    :param str arch: the specific architecture of the container image
+    :param bool include_transport: if true, `docker://` will be prefixed in the returned pull
+        specification
+    :return: the pull specification of the single arch image in the external registry
+    :rtype: str
+    """
+    pull_spec = f'{rebuilt_pull_spec}-{arch}'
     if include_transport:
         return f'docker://{pull_spec}'
     return pull_spec
@@ -569,40 +749,27 @@ def _update_index_image_build_state(
     update_request(request_id, payload, exc_msg)
 
 
-@retry(
-    before_sleep=before_sleep_log(log, logging.WARNING),
-    reraise=True,
-    retry=retry_if_exception_type(IIBError),
-    stop=stop_after_attempt(worker_config.iib_total_attempts),
-    wait=wait_exponential(worker_config.iib_retry_multiplier),
-)
 def _push_image(request_id: int, arch: str) -> None:
     """
     Push the single arch container image to the configured registry.
 
+    The image is copied straight from the local containers storage with ``skopeo copy``, which
+    uploads the layers in parallel and always produces a Docker v2 schema 2 manifest.
+
     :param int request_id: the ID of the IIB build request
     :param str arch: the architecture of the container image to push
     :raises IIBError: if the push fails
     """
-    source = _get_local_pull_spec(request_id, arch)
+    source = _get_local_pull_spec(request_id, arch, include_transport=True)
     destination = _get_external_arch_pull_spec(request_id, arch, include_transport=True)
     log.info('Pushing the container image %s to %s', source, destination)
-    run_cmd(
-        ['podman', 'push', '-q', source, destination],
+    _skopeo_copy(
+        source,
+        destination,
         exc_msg=f'Failed to push the container image to {destination} for the arch {arch}',
+        compression_level=get_worker_config()['iib_push_compression_level'],
     )
 
-    log.debug(f'Verifying that {destination} was pushed as a v2 manifest due to RHBZ#1810768')
-    skopeo_raw = skopeo_inspect(destination, '--raw')
-    if skopeo_raw['schemaVersion'] != 2:
-        log.warning(
-            'The manifest for %s ended up using schema version 1 due to RHBZ#1810768. Manually '
-            'fixing it with skopeo.',
-            destination,
-        )
-        exc_msg = f'Failed to fix the manifest schema version on {destination}'
-        _skopeo_copy(destination, destination, exc_msg=exc_msg)
-
 
 @retry(
     before_sleep=before_sleep_log(log, logging.WARNING),
@@ -616,6 +783,7 @@ def _skopeo_copy(
     destination: str,
     copy_all: bool = False,
     exc_msg: Optional[str] = None,
+    compression_level: Optional[int] = None,
 ) -> None:
     """
     Wrap the ``skopeo copy`` command.
@@ -624,6 +792,8 @@ def _skopeo_copy(
     :param str destination: the destination to copy the source to
     :param bool copy_all: if True, it passes ``--all`` to the command
     :param str exc_msg: a custom exception message to provide
+    :param int compression_level: the gzip compression level of the layers compressed by the copy;
+        if ``None``, the skopeo default is used
     :raises IIBError: if the copy fails
     """
     skopeo_timeout = get_worker_config()['iib_skopeo_timeout']
@@ -631,6 +801,8 @@ def _skopeo_copy(
     cmd = ['skopeo', '--command-timeout', skopeo_timeout, 'copy', '--format', 'v2s2']
     if copy_all:
         cmd.append('--all')
+    if compression_level is not None:
+        cmd.extend(['--dest-compress-level', str(compression_level)])
     cmd.extend([source, destination])
 
     run_cmd(cmd, exc_msg=exc_msg or f'Failed to copy {source} to {destination}')
@@ -758,13 +930,16 @@ def handle_add_request(
     :param str traceparent: the traceparent header value to be used for tracing the request.
     :raises IIBError: if the index image build fails.
     """
-    _cleanup()
+    # The container images are only removed once the request is validated, so that the images
+    # on the host are kept if the request is rejected
+    reset_docker_config()
     # Resolve bundles to their digests
     set_request_state(request_id, 'in_progress', 'Resolving the bundles')
 
     with set_registry_token(overwrite_from_index_token, from_index, append=True):
-        resolved_bundles = get_resolved_bundles(bundles)
-        verify_labels(resolved_bundles)
+        resolved_bundles_mapping = get_resolved_bundles_mapping(bundles)
+        resolved_bundles = list(set(resolved_bundles_mapping.values()))
+        resolved_bundles_labels = verify_labels(resolved_bundles)
         if check_related_images:
             inspect_related_images(resolved_bundles, request_id)
 
@@ -774,6 +949,12 @@ def handle_add_request(
     else:
         log.warning('Greenwave checks are disabled. Bundles will not be gated.')
 
+    # Reuse the labels of the verified bundles for the bundle mapping of the request
+    bundles_labels = {
+        bundle: resolved_bundles_labels[resolved_bundle]
+        for bundle, resolved_bundle in resolved_bundles_mapping.items()
+        if resolved_bundle in resolved_bundles_labels
+    }
     prebuild_info = prepare_request_for_build(
         request_id,
         RequestConfigAddRm(
@@ -782,10 +963,12 @@ def handle_add_request(
             overwrite_from_index_token=overwrite_from_index_token,
             add_arches=add_arches,
             bundles=bundles,
+            bundles_labels=bundles_labels or None,
             distribution_scope=distribution_scope,
             binary_image_config=binary_image_config,
         ),
     )
+    _cleanup(request_id)
     from_index_resolved = prebuild_info['from_index_resolved']
     Opm.set_opm_version(from_index_resolved)
     with set_registry_token(overwrite_from_index_token, from_index_resolved):
@@ -803,7 +986,9 @@ def handle_add_request(
     _update_index_image_build_state(request_id, prebuild_info)
     present_bundles: List[BundleImage] = []
     present_bundles_pull_spec: List[str] = []
-    with tempfile.TemporaryDirectory(prefix=f'iib-{request_id}-') as temp_dir:
+    with tempfile.TemporaryDirectory(
+        prefix=f'iib-{request_id}-', dir=worker_config['iib_tmpfs_dir']
+    ) as temp_dir:
         if from_index:
             msg = 'Checking if bundles are already present in index image'
             log.info(msg)
@@ -906,19 +1091,21 @@ def handle_add_request(
         )
 
         if is_fbc:
-            os.makedirs(os.path.join(temp_dir, 'from_db'), exist_ok=True)
+            from_db_dir = os.path.join(temp_dir, 'from_db')
+            os.makedirs(from_db_dir, exist_ok=True)
             index_db_file = os.path.join(temp_dir, get_worker_config()['temp_index_db_path'])
             # get catalog from SQLite index.db (hidden db) - not opted in operators
             catalog_from_db, _ = opm_migrate(
                 index_db=index_db_file,
-                base_dir=os.path.join(temp_dir, 'from_db'),
+                base_dir=from_db_dir,
                 generate_cache=False,
             )
             # get catalog with opted-in operators
-            os.makedirs(os.path.join(temp_dir, 'from_index'), exist_ok=True)
+            from_index_dir = os.path.join(temp_dir, 'from_index')
+            os.makedirs(from_index_dir, exist_ok=True)
             with set_registry_token(overwrite_from_index_token, from_index_resolved, append=True):
                 catalog_from_index = get_catalog_dir(
-                    from_index=from_index_resolved, base_dir=os.path.join(temp_dir, 'from_index')
+                    from_index=from_index_resolved, base_dir=from_index_dir
                 )
 
             # we have to remove all `deprecation_bundles` from `catalog_from_index`
@@ -955,9 +1142,7 @@ def handle_add_request(
                 shutil.rmtree(local_cache_path)
             generate_cache_locally(temp_dir, fbc_dir_path, local_cache_path)
 
-        for arch in sorted(arches):
-            _build_image(temp_dir, 'index.Dockerfile', request_id, arch)
-            _push_image(request_id, arch)
+        _build_and_push_arches(temp_dir, 'index.Dockerfile', request_id, arches)
 
         # If the container-tool podman is used in the opm commands above, opm will create temporary
         # files and directories without the write permission. This will cause the context manager
@@ -968,20 +1153,16 @@ def handle_add_request(
             file_mode=(stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IWGRP),
         )
 
-    set_request_state(request_id, 'in_progress', 'Creating the manifest list')
-    output_pull_spec = _create_and_push_manifest_list(request_id, arches, build_tags)
-
-    _update_index_image_pull_spec(
-        output_pull_spec,
+    _push_manifest_list_and_update_request(
         request_id,
         arches,
-        from_index,
-        overwrite_from_index,
-        overwrite_from_index_token,
-        from_index_resolved,
-        add_or_rm=True,
+        build_tags=build_tags,
+        from_index=from_index,
+        overwrite_from_index=overwrite_from_index,
+        overwrite_from_index_token=overwrite_from_index_token,
+        from_index_resolved=from_index_resolved,
     )
-    _cleanup()
+    _cleanup(request_id)
     set_request_state(
         request_id, 'complete', 'The operator bundle(s) were successfully added to the index image'
     )
@@ -1026,7 +1207,7 @@ def handle_rm_request(
     :param list build_tags: List of tags which will be applied to intermediate index images.
     :raises IIBError: if the index image build fails.
     """
-    _cleanup()
+    reset_docker_config()
     prebuild_info = prepare_request_for_build(
         request_id,
         RequestConfigAddRm(
@@ -1038,12 +1219,15 @@ def handle_rm_request(
             binary_image_config=binary_image_config,
         ),
     )
+    _cleanup(request_id)
     _update_index_image_build_state(request_id, prebuild_info)
 
     from_index_resolved = prebuild_info['from_index_resolved']
     Opm.set_opm_version(from_index_resolved)
 
-    with tempfile.TemporaryDirectory(prefix=f'iib-{request_id}-') as temp_dir:
+    with tempfile.TemporaryDirectory(
+        prefix=f'iib-{request_id}-', dir=worker_config['iib_tmpfs_dir']
+    ) as temp_dir:
         with set_registry_token(overwrite_from_index_token, from_index_resolved, append=True):
             image_is_fbc = is_image_fbc(from_index_resolved)
 
@@ -1063,11 +1247,12 @@ def handle_rm_request(
             catalog_from_db = os.path.join(temp_dir, 'from_db')
             os.rename(fbc_dir, catalog_from_db)
 
-            os.makedirs(os.path.join(temp_dir, 'from_index'), exist_ok=True)
+            from_index_dir = os.path.join(temp_dir, 'from_index')
+            os.makedirs(from_index_dir, exist_ok=True)
             # get catalog with opted-in operators
             with set_registry_token(overwrite_from_index_token, from_index_resolved, append=True):
                 catalog_from_index = get_catalog_dir(
-                    from_index=from_index_resolved, base_dir=os.path.join(temp_dir, 'from_index')
+                    from_index=from_index_resolved, base_dir=from_index_dir
                 )
             # remove operators from from_index file-based catalog
             for operator in operators:
@@ -1117,9 +1302,7 @@ def handle_rm_request(
         )
 
         arches = prebuild_info['arches']
-        for arch in sorted(arches):
-            _build_image(temp_dir, 'index.Dockerfile', request_id, arch)
-            _push_image(request_id, arch)
+        _build_and_push_arches(temp_dir, 'index.Dockerfile', request_id, arches)
 
         # If the container-tool podman is used in the opm commands above, opm will create temporary
         # files and directories without the write permission. This will cause the context manager
@@ -1130,20 +1313,16 @@ def handle_rm_request(
             file_mode=(stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IWGRP),
         )
 
-    set_request_state(request_id, 'in_progress', 'Creating the manifest list')
-    output_pull_spec = _create_and_push_manifest_list(request_id, arches, build_tags)
-
-    _update_index_image_pull_spec(
-        output_pull_spec,
+    _push_manifest_list_and_update_request(
         request_id,
         arches,
-        from_index,
-        overwrite_from_index,
-        overwrite_from_index_token,
-        from_index_resolved,
-        add_or_rm=True,
+        build_tags=build_tags,
+        from_index=from_index,
+        overwrite_from_index=overwrite_from_index,
+        overwrite_from_index_token=overwrite_from_index_token,
+        from_index_resolved=from_index_resolved,
     )
-    _cleanup()
+    _cleanup(request_id)
     set_request_state(
         request_id, 'complete', 'The operator(s) were successfully removed from the index image'
     )
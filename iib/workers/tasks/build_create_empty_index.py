@@ -84,7 +84,7 @@ def handle_create_empty_index_request(
     :param dict binary_image_config: the dict of config required to identify the appropriate
         ``binary_image`` to use.
     """
-    _cleanup()
+    _cleanup(request_id)
     prebuild_info: PrebuildInfo = prepare_request_for_build(
         request_id,
         RequestConfigCreateIndexImage(
@@ -162,5 +162,5 @@ def handle_create_empty_index_request(
         from_index=from_index,
         resolved_prebuild_from_index=from_index_resolved,
     )
-    _cleanup()
+    _cleanup(request_id)
     set_request_state(request_id, 'complete', 'The empty index image was successfully created')
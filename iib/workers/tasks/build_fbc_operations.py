@@ -60,7 +60,7 @@ def handle_fbc_operation_request(
         currently built for; if ``from_index`` is ``None``, then this is used as the list of arches
         to build the index image for
     """
-    _cleanup()
+    _cleanup(request_id)
     set_request_state(request_id, 'in_progress', 'Resolving the fbc fragment')
 
     with set_registry_token(overwrite_from_index_token, fbc_fragment, append=True):
@@ -129,7 +129,7 @@ def handle_fbc_operation_request(
         from_index_resolved,
         add_or_rm=True,
     )
-    _cleanup()
+    _cleanup(request_id)
     set_request_state(
         request_id, 'complete', 'The FBC fragment was successfully added in the index image'
     )
@@ -237,7 +237,7 @@ def handle_merge_request(
         "com.redhat.openshift.versions" label set will be added in the result `index_image`.
     :raises IIBError: if the index image merge fails.
     """
-    _cleanup()
+    _cleanup(request_id)
     with set_registry_token(overwrite_target_index_token, target_index, append=True):
         prebuild_info = prepare_request_for_build(
             request_id,
@@ -415,7 +415,7 @@ def handle_merge_request(
         overwrite_target_index_token,
         target_index_resolved,
     )
-    _cleanup()
+    _cleanup(request_id)
     set_request_state(
         request_id, 'complete', 'The index image was successfully cleaned and updated.'
     )
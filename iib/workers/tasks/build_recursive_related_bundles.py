@@ -71,7 +71,7 @@ def handle_recursive_related_bundles_request(
       registries, defaults to ``None``.
     :raises IIBError: if the recursive related bundles build fails.
     """
-    _cleanup()
+    _cleanup(request_id)
 
     set_request_state(request_id, 'in_progress', 'Resolving parent_bundle_image')
 
@@ -127,7 +127,7 @@ def handle_recursive_related_bundles_request(
         'state': 'complete',
         'state_reason': 'The request completed successfully',
     }
-    _cleanup()
+    _cleanup(request_id)
     update_request(request_id, payload, exc_msg='Failed setting the bundle image on the request')
 
 
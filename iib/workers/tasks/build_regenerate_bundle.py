@@ -76,7 +76,7 @@ def handle_regenerate_bundle_request(
       bundle pullspecs.
     :raises IIBError: if the regenerate bundle image build fails.
     """
-    _cleanup()
+    _cleanup(request_id)
 
     set_request_state(request_id, 'in_progress', 'Resolving from_bundle_image')
 
@@ -160,7 +160,7 @@ def handle_regenerate_bundle_request(
         'state': 'complete',
         'state_reason': 'The request completed successfully',
     }
-    _cleanup()
+    _cleanup(request_id)
     update_request(request_id, payload, exc_msg='Failed setting the bundle image on the request')
 
 
@@ -7,8 +7,8 @@ import celery.app.task
 from iib.exceptions import IIBError
 from iib.workers.api_utils import set_request_state
 from iib.workers.tasks.celery import app
-from iib.workers.tasks.utils import request_logger
-from iib.workers.tasks.build import _cleanup
+from iib.workers.tasks.utils import request_logger, reset_docker_config
+from iib.workers.tasks.build import _remove_request_images
 
 __all__ = ['failed_request_callback', 'set_request_state']
 
@@ -26,6 +26,9 @@ def failed_request_callback(
     """
     Wrap set_request_state for task error callbacks.
 
+    Only the container images built for the request are removed, so that a failed request doesn't
+    wipe the images cached on the host for the following requests.
+
     :param celery.app.task.Context context: the context of the task failure
     :param Exception exc: the exception that caused the task failure
     :param int request_id: the ID of the IIB request
@@ -36,5 +39,6 @@ def failed_request_callback(
         msg = 'An unknown error occurred. See logs for details'
         log.error(msg, exc_info=exc)
 
-    _cleanup()
+    _remove_request_images(request_id)
+    reset_docker_config()
     set_request_state(request_id, 'failed', msg)
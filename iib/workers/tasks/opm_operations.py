@@ -712,8 +712,8 @@ def insert_cache_into_dockerfile(dockerfile_path: str) -> None:
     with open(dockerfile_path, 'w') as f:
         f.write(file_data)
 
-    with open(dockerfile_path, 'r') as f:
-        verify_cache_insertion_edit_dockerfile(f.readlines())
+    # Verify the content which was just written instead of reading the Dockerfile back
+    verify_cache_insertion_edit_dockerfile(file_data.splitlines(keepends=True))
 
 
 @create_port_filelocks(port_purposes=["opm_pprof_port"])
@@ -3,6 +3,7 @@ import base64
 import getpass
 import socket
 from typing import Any, Callable, Dict, Generator, List, Optional, Set, TYPE_CHECKING, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 import functools
 import hashlib
@@ -33,8 +34,9 @@ from iib.workers.dogpile_cache import (
     skopeo_inspect_should_use_cache,
 )
 
-from iib.exceptions import IIBError, ExternalServiceError
+from iib.exceptions import IIBError, ExternalServiceError, RegistryClientError
 from iib.workers.config import get_worker_config
+from iib.workers.registry_client import registry_client
 from iib.workers.s3_utils import upload_file_to_s3_bucket
 from iib.workers.api_utils import set_request_state
 from iib.workers.tasks.opm_operations import opm_registry_serve, opm_serve_from_index
@@ -295,6 +297,8 @@ class RequestConfigAddRm(RequestConfig):
         to build the index image for
     :param list bundles: the list of bundles to create the
         bundle mapping on the request
+    :param dict bundles_labels: the already known labels of the
+        ``bundles``, so that they don't need to be inspected again
     """
 
     _attrs: List[str] = RequestConfig._attrs + [
@@ -302,6 +306,7 @@ class RequestConfigAddRm(RequestConfig):
         "from_index",
         "add_arches",
         "bundles",
+        "bundles_labels",
         "operators",
     ]
     __slots__ = _attrs
@@ -310,6 +315,7 @@ class RequestConfigAddRm(RequestConfig):
         from_index: str
         add_arches: Set[str]
         bundles: List[str]
+        bundles_labels: Dict[str, Dict[str, str]]
         operators: List[str]
 
 
@@ -432,8 +438,22 @@ def get_resolved_bundles(bundles: List[str]) -> List[str]:
     :rtype: list
     :raises IIBError: if unable to resolve a bundle image.
     """
+    return list(set(get_resolved_bundles_mapping(bundles).values()))
+
+
+def get_resolved_bundles_mapping(bundles: List[str]) -> Dict[str, str]:
+    """
+    Get the pull specifications of the bundle images mapped to their pull specifications by digest.
+
+    See ``get_resolved_bundles`` for how the bundle images are resolved.
+
+    :param list bundles: the list of bundle images to be resolved.
+    :return: the dictionary mapping the bundle images to their pull specifications using digests.
+    :rtype: dict
+    :raises IIBError: if unable to resolve a bundle image.
+    """
     log.info('Resolving bundles %s', ', '.join(bundles))
-    resolved_bundles = set()
+    resolved_bundles = {}
     for bundle_pull_spec in bundles:
         skopeo_raw = skopeo_inspect(
             f'docker://{bundle_pull_spec}', '--raw', require_media_type=True
@@ -445,12 +465,12 @@ def get_resolved_bundles(bundles: List[str]) -> List[str]:
             # Get the digest of the first item in the manifest list
             digest = skopeo_raw['manifests'][0]['digest']
             name = _get_container_image_name(bundle_pull_spec)
-            resolved_bundles.add(f'{name}@{digest}')
+            resolved_bundles[bundle_pull_spec] = f'{name}@{digest}'
         elif (
             skopeo_raw.get('mediaType') == 'application/vnd.docker.distribution.manifest.v2+json'
             and skopeo_raw.get('schemaVersion') == 2
         ):
-            resolved_bundles.add(get_resolved_image(bundle_pull_spec))
+            resolved_bundles[bundle_pull_spec] = get_resolved_image(bundle_pull_spec)
         else:
             error_msg = (
                 f'The pull specification of {bundle_pull_spec} is neither '
@@ -459,7 +479,7 @@ def get_resolved_bundles(bundles: List[str]) -> List[str]:
             )
             raise IIBError(error_msg)
 
-    return list(resolved_bundles)
+    return resolved_bundles
 
 
 def _get_container_image_name(pull_spec: str) -> str:
@@ -517,6 +537,24 @@ def get_image_labels(pull_spec: str) -> Dict[str, str]:
     return skopeo_inspect(full_pull_spec, '--config').get('config', {}).get('Labels', {})
 
 
+def get_images_labels(pull_specs: List[str], max_workers: int = 16) -> Dict[str, Dict[str, str]]:
+    """
+    Get the labels from multiple images concurrently.
+
+    :param list pull_specs: the pull specifications of the images to get the labels from
+    :param int max_workers: the maximum number of images to inspect at the same time
+    :return: the dictionary mapping the pull specifications to the labels of the images
+    :rtype: dict
+    :raises IIBError: if any of the images can't be inspected
+    """
+    unique_pull_specs = list(dict.fromkeys(pull_specs))
+    if not unique_pull_specs:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_pull_specs))) as executor:
+        return dict(zip(unique_pull_specs, executor.map(get_image_labels, unique_pull_specs)))
+
+
 def reset_docker_config() -> None:
     """Create a symlink from ``iib_docker_config_template`` to ``~/.docker/config.json``."""
     conf = get_worker_config()
@@ -645,7 +683,9 @@ def set_registry_auths(registry_auths: Optional[Dict[str, Any]]) -> Generator:
     wait=wait_chain(wait_exponential(multiplier=get_worker_config().iib_retry_multiplier)),
 )
 @dogpile_cache(
-    dogpile_region=dogpile_cache_region, should_use_cache_fn=skopeo_inspect_should_use_cache
+    dogpile_region=dogpile_cache_region,
+    should_use_cache_fn=skopeo_inspect_should_use_cache,
+    local_cache_size=get_worker_config().iib_dogpile_local_cache_size,
 )
 def skopeo_inspect(
     *args,
@@ -670,9 +710,14 @@ def skopeo_inspect(
             exc_msg = f'Failed to inspect {arg}. Make sure it exists and is accessible to IIB.'
             break
 
-    skopeo_timeout = get_worker_config().iib_skopeo_timeout
-    cmd = ['skopeo', '--command-timeout', skopeo_timeout, 'inspect'] + list(args)
-    output = run_cmd(cmd, exc_msg=exc_msg)
+    output = None
+    if get_worker_config().iib_use_registry_client:
+        output = _registry_client_inspect(*args)
+
+    if output is None:
+        skopeo_timeout = get_worker_config().iib_skopeo_timeout
+        cmd = ['skopeo', '--command-timeout', skopeo_timeout, 'inspect'] + list(args)
+        output = run_cmd(cmd, exc_msg=exc_msg)
     if not return_json:
         return output
 
@@ -683,6 +728,33 @@ def skopeo_inspect(
     return json_output
 
 
+def _registry_client_inspect(*args) -> Optional[str]:
+    """
+    Get the output of ``skopeo inspect`` directly from the registry API when possible.
+
+    Only the ``--raw`` and ``--config`` inspections of a ``docker://`` pull specification are
+    supported.
+
+    :param args: the arguments which would be passed to ``skopeo inspect``
+    :return: the raw output or ``None`` if ``skopeo`` needs to be used instead
+    :rtype: str
+    """
+    if (
+        len(args) != 2
+        or not args[0].startswith('docker://')
+        or args[1] not in ('--raw', '--config')
+    ):
+        return None
+
+    try:
+        if args[1] == '--raw':
+            return registry_client.get_manifest(args[0])
+        return registry_client.get_config(args[0])
+    except RegistryClientError as e:
+        log.debug('Falling back to skopeo to inspect %s: %s', args[0], e)
+        return None
+
+
 @retry(
     before_sleep=before_sleep_log(log, logging.WARNING),
     reraise=True,
@@ -932,6 +1004,27 @@ def gather_index_image_arches(
     return arches
 
 
+def _get_image_config(pull_spec: str, config_digest: Optional[str]) -> Dict[str, Any]:
+    """
+    Get the config of the single arch container image.
+
+    If the registry client is enabled, the config blob referenced by the already inspected
+    manifest is downloaded directly instead of inspecting the manifest again.
+
+    :param str pull_spec: the pull specification of the container image
+    :param str config_digest: the digest of the config blob from the image manifest
+    :return: the config of the container image
+    :rtype: dict
+    """
+    if config_digest and get_worker_config().iib_use_registry_client:
+        try:
+            return json.loads(registry_client.get_blob(f'docker://{pull_spec}', config_digest))
+        except (RegistryClientError, ValueError) as e:
+            log.debug('Falling back to skopeo to get the config of %s: %s', pull_spec, e)
+
+    return skopeo_inspect(f'docker://{pull_spec}', '--config')
+
+
 def get_image_arches(pull_spec: str) -> Set[str]:
     """
     Get the architectures this image was built for.
@@ -948,8 +1041,9 @@ def get_image_arches(pull_spec: str) -> Set[str]:
         for manifest in skopeo_raw['manifests']:
             arches.add(manifest['platform']['architecture'])
     elif skopeo_raw.get('mediaType') == 'application/vnd.docker.distribution.manifest.v2+json':
-        skopeo_out = skopeo_inspect(f'docker://{pull_spec}', '--config')
-        arches.add(skopeo_out['architecture'])
+        config_digest = skopeo_raw.get('config', {}).get('digest')
+        image_config = _get_image_config(pull_spec, config_digest)
+        arches.add(image_config['architecture'])
     else:
         raise IIBError(
             f'The pull specification of {pull_spec} is neither a v2 manifest list nor a v2 manifest'
@@ -985,13 +1079,14 @@ def get_index_image_info(
 
     with set_registry_token(overwrite_from_index_token, from_index):
         from_index_resolved = get_resolved_image(from_index)
-        result['arches'] = get_image_arches(from_index_resolved)
-        result['ocp_version'] = (
-            get_image_label(from_index_resolved, 'com.redhat.index.delivery.version') or 'v4.5'
-        )
+        # The arches and the labels are independent lookups, so inspect them at the same time
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            arches_future = executor.submit(get_image_arches, from_index_resolved)
+            labels = get_image_labels(from_index_resolved)
+            result['arches'] = arches_future.result()
+        result['ocp_version'] = labels.get('com.redhat.index.delivery.version') or 'v4.5'
         result['resolved_distribution_scope'] = (
-            get_image_label(from_index_resolved, 'com.redhat.index.delivery.distribution_scope')
-            or 'prod'
+            labels.get('com.redhat.index.delivery.distribution_scope') or 'prod'
         )
         result['resolved_from_index'] = from_index_resolved
     return result
@@ -1049,24 +1144,30 @@ def get_image_label(pull_spec: str, label: str) -> str:
     return get_image_labels(pull_spec).get(label, '')
 
 
-def verify_labels(bundles: List[str]) -> None:
+def verify_labels(bundles: List[str]) -> Dict[str, Dict[str, str]]:
     """
     Verify that the required labels are set on the input bundles.
 
     :param list bundles: a list of strings representing the pull specifications of the bundles to
         add to the index image being built.
+    :return: the dictionary mapping the bundles to their labels; it's empty if no labels are
+        required, since the bundles aren't inspected then
+    :rtype: dict
     :raises IIBError: if one of the bundles does not have the correct label value.
     """
     conf = get_worker_config()
     if not conf['iib_required_labels']:
-        return
+        return {}
 
+    bundles_labels = get_images_labels(bundles)
     for bundle in bundles:
-        labels = get_image_labels(bundle)
+        labels = bundles_labels[bundle]
         for label, value in conf['iib_required_labels'].items():
             if labels.get(label) != value:
                 raise IIBError(f'The bundle {bundle} does not have the label {label}={value}')
 
+    return bundles_labels
+
 
 def _validate_distribution_scope(resolved_distribution_scope: str, distribution_scope: str) -> str:
     """
@@ -1124,6 +1225,11 @@ def prepare_request_for_build(
 
     if bundles is None:
         bundles = []
+    known_bundles_labels = (
+        build_request_config.bundles_labels
+        if isinstance(build_request_config, RequestConfigAddRm)
+        else None
+    ) or {}
 
     set_request_state(request_id, 'in_progress', 'Resolving the container images')
 
@@ -1169,8 +1275,12 @@ def prepare_request_for_build(
         )
 
     bundle_mapping: Dict[str, Any] = {}
+    bundles_labels = {
+        **known_bundles_labels,
+        **get_images_labels([bundle for bundle in bundles if bundle not in known_bundles_labels]),
+    }
     for bundle in bundles:
-        operator = get_image_label(bundle, 'operators.operatorframework.io.bundle.package.v1')
+        operator = bundles_labels[bundle].get('operators.operatorframework.io.bundle.package.v1')
         if operator:
             bundle_mapping.setdefault(operator, []).append(bundle)
     source_from_index_resolved = index_info['source_from_index']['resolved_from_index']
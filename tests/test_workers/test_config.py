@@ -249,6 +249,21 @@ def test_validate_celery_config_request_logs_dir_misconfigured(tmpdir, file_type
         validate_celery_config(conf)
 
 
+def test_validate_celery_config_tmpfs_dir_missing(tmpdir):
+    conf = {
+        'iib_api_url': 'http://localhost:8080/api/v1/',
+        'iib_organization_customizations': {},
+        'iib_registry': 'registry',
+        'iib_required_labels': {},
+        'iib_request_recursive_related_bundles_dir': str(tmpdir),
+        'iib_ocp_opm_mapping': {},
+        'iib_default_opm': 'opm',
+        'iib_tmpfs_dir': str(tmpdir.join('shm')),
+    }
+    with pytest.raises(ConfigError, match='iib_tmpfs_dir must exist and be a directory'):
+        validate_celery_config(conf)
+
+
 @pytest.mark.parametrize(
     'config, error',
     (
@@ -360,6 +375,38 @@ def test_validate_celery_config_invalid_iib_no_ocp_label_allow_list():
         validate_celery_config(worker_config)
 
 
+@pytest.mark.parametrize('max_parallel_arch_builds', (0, -1, '4'))
+def test_validate_celery_config_invalid_iib_max_parallel_arch_builds(max_parallel_arch_builds):
+    worker_config = {
+        'iib_api_url': 'http://localhost:8080/api/v1/',
+        'iib_registry': 'registry',
+        'iib_required_labels': {},
+        'iib_max_parallel_arch_builds': max_parallel_arch_builds,
+        'iib_ocp_opm_mapping': {},
+        'iib_default_opm': 'opm',
+    }
+
+    error = 'iib_max_parallel_arch_builds must be a positive integer'
+    with pytest.raises(ConfigError, match=error):
+        validate_celery_config(worker_config)
+
+
+@pytest.mark.parametrize('push_compression_level', (0, 10, '1'))
+def test_validate_celery_config_invalid_iib_push_compression_level(push_compression_level):
+    worker_config = {
+        'iib_api_url': 'http://localhost:8080/api/v1/',
+        'iib_registry': 'registry',
+        'iib_required_labels': {},
+        'iib_push_compression_level': push_compression_level,
+        'iib_ocp_opm_mapping': {},
+        'iib_default_opm': 'opm',
+    }
+
+    error = 'iib_push_compression_level must be an integer between 1 and 9'
+    with pytest.raises(ConfigError, match=error):
+        validate_celery_config(worker_config)
+
+
 def test_validate_celery_config_iib_opm_ocp_mapping_incorrect_type():
     worker_config = {
         'iib_api_url': 'http://localhost:8080/api/v1/',
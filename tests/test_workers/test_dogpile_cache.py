@@ -1,7 +1,9 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
+from unittest import mock
+
 import pytest
 
-from iib.workers.dogpile_cache import generate_cache_key
+from iib.workers.dogpile_cache import dogpile_cache, generate_cache_key
 
 
 @pytest.mark.parametrize(
@@ -33,3 +35,43 @@ from iib.workers.dogpile_cache import generate_cache_key
 def test_generate_cache_key(args, kwargs):
     passwd = generate_cache_key('function_name', *args, **kwargs)
     assert len(passwd) <= 250
+
+
+@pytest.mark.parametrize('local_cache_size', (0, 2))
+def test_dogpile_cache_local_cache(local_cache_size):
+    region = mock.Mock()
+    region.get.return_value = None
+    func = mock.Mock(__name__='func', side_effect=lambda arg: {'arg': arg})
+    cached_func = dogpile_cache(region, lambda *args: True, local_cache_size=local_cache_size)(func)
+
+    assert cached_func('a') == {'arg': 'a'}
+    cached_func('a')['arg'] = 'modified'
+    assert cached_func('a') == {'arg': 'a'}
+
+    if local_cache_size:
+        assert func.call_count == 1
+        assert region.get.call_count == 1
+    else:
+        assert func.call_count == 3
+        assert region.get.call_count == 3
+
+
+def test_dogpile_cache_local_cache_eviction():
+    region = mock.Mock()
+    region.get.return_value = None
+    func = mock.Mock(__name__='func', side_effect=lambda arg: {'arg': arg})
+    cached_func = dogpile_cache(region, lambda *args: True, local_cache_size=2)(func)
+
+    cached_func('a')
+    cached_func('b')
+    cached_func('a')
+    # 'b' is the least recently used value, so it's evicted
+    cached_func('c')
+    cached_func('a')
+    assert func.call_count == 3
+    cached_func('b')
+    assert func.call_count == 4
+
+    cached_func.cache_clear()
+    cached_func('b')
+    assert func.call_count == 5
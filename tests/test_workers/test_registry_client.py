@@ -0,0 +1,258 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+from concurrent.futures import ThreadPoolExecutor
+import json
+from unittest import mock
+
+import pytest
+import requests
+
+from iib.exceptions import RegistryClientError
+from iib.workers import registry_client
+
+
+def _response(status_code=200, content=b'', headers=None, json_data=None):
+    response = mock.Mock(status_code=status_code, content=content, headers=headers or {})
+    response.ok = status_code < 400
+    if json_data is None:
+        response.json.side_effect = json.JSONDecodeError('Expecting value', content.decode(), 0)
+    else:
+        response.json.return_value = json_data
+    return response
+
+
+_CHALLENGE = 'Bearer realm="https://quay.io/v2/auth",service="quay.io"'
+
+
+@pytest.mark.parametrize(
+    'pull_spec, expected',
+    (
+        ('docker://quay.io/ns/repo:v1', ('quay.io', 'ns/repo', 'v1')),
+        ('quay.io/ns/repo@sha256:123', ('quay.io', 'ns/repo', 'sha256:123')),
+        ('localhost:5000/repo', ('localhost:5000', 'repo', 'latest')),
+        ('docker.io/fedora:33', ('docker.io', 'library/fedora', '33')),
+    ),
+)
+def test_parse_pull_spec(pull_spec, expected):
+    assert registry_client._parse_pull_spec(pull_spec) == expected
+
+
+@pytest.mark.parametrize('pull_spec', ('fedora:33', 'ns/repo:v1', 'quay.io'))
+def test_parse_pull_spec_no_registry(pull_spec):
+    with pytest.raises(RegistryClientError, match='The registry of .+ is not known'):
+        registry_client._parse_pull_spec(pull_spec)
+
+
+@pytest.mark.parametrize(
+    'duration, expected',
+    (('300s', 300), ('5m', 300), ('1h30m', 5400), ('1.5s', 1.5), ('500ms', 0.5)),
+)
+def test_parse_duration(duration, expected):
+    assert registry_client._parse_duration(duration) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('duration', ('', '300', 's', '5 m', '-1s'))
+def test_parse_duration_invalid(duration):
+    with pytest.raises(RegistryClientError, match='is not valid'):
+        registry_client._parse_duration(duration)
+
+
+@mock.patch('iib.workers.registry_client.get_worker_config')
+def test_timeout(mock_gwc):
+    mock_gwc.return_value = mock.Mock(iib_skopeo_timeout='2m')
+
+    assert registry_client.RegistryClient().timeout == 120
+    assert registry_client.RegistryClient(timeout=10).timeout == 10
+
+
+def test_session_shared_between_threads():
+    client = registry_client.RegistryClient()
+    sessions = []
+
+    def get_session():
+        sessions.append(client.session)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        executor.submit(get_session)
+        executor.submit(get_session)
+
+    assert sessions == [client.session, client.session]
+    assert client.session.get_adapter('https://quay.io')._pool_maxsize == 16
+
+
+@mock.patch('iib.workers.registry_client._get_registry_credentials')
+def test_get_manifest_bearer_auth(mock_grc):
+    mock_grc.return_value = 'dXNlcjpwYXNz'
+    client = registry_client.RegistryClient()
+    session = mock.Mock()
+    session.get.side_effect = [
+        _response(401, headers={'WWW-Authenticate': _CHALLENGE}),
+        _response(json_data={'token': 'secret'}),
+        _response(content=b'{"schemaVersion": 2}'),
+        _response(content=b'{"schemaVersion": 2, "tag": "v2"}'),
+    ]
+    client.session = session
+
+    assert client.get_manifest('docker://quay.io/ns/repo:v1') == '{"schemaVersion": 2}'
+    # The token is reused for the following requests to the same repository
+    assert client.get_manifest('quay.io/ns/repo:v2') == '{"schemaVersion": 2, "tag": "v2"}'
+
+    assert session.get.call_count == 4
+    session.get.assert_any_call(
+        'https://quay.io/v2/auth',
+        params={'scope': 'repository:ns/repo:pull', 'service': 'quay.io'},
+        headers={'Authorization': 'Basic dXNlcjpwYXNz'},
+        timeout=300.0,
+    )
+    last_call = session.get.call_args_list[-1]
+    assert last_call[0] == ('https://quay.io/v2/ns/repo/manifests/v2',)
+    assert last_call[1]['headers']['Authorization'] == 'Bearer secret'
+
+
+@mock.patch('iib.workers.registry_client.time.monotonic')
+@mock.patch('iib.workers.registry_client._get_registry_credentials')
+def test_get_manifest_token_expired(mock_grc, mock_monotonic):
+    mock_grc.return_value = None
+    client = registry_client.RegistryClient()
+    responses = iter(
+        [
+            _response(401, headers={'WWW-Authenticate': _CHALLENGE}),
+            _response(json_data={'token': 'first', 'expires_in': 300}),
+            _response(content=b'{"schemaVersion": 2}'),
+            _response(401, headers={'WWW-Authenticate': _CHALLENGE}),
+            _response(json_data={'token': 'second'}),
+            _response(content=b'{"schemaVersion": 2}'),
+        ]
+    )
+    sent_headers = []
+
+    def _get(url, headers, **kwargs):
+        # Copy the headers since the client modifies them after the request
+        sent_headers.append(dict(headers))
+        return next(responses)
+
+    session = mock.Mock()
+    session.get.side_effect = _get
+    client.session = session
+
+    mock_monotonic.return_value = 1000
+    client.get_manifest('quay.io/ns/repo:v1')
+    assert client._tokens == {('quay.io', 'ns/repo', None): ('first', 1290)}
+
+    # The expired token is replaced by a new one
+    mock_monotonic.return_value = 1300
+    client.get_manifest('quay.io/ns/repo:v1')
+    assert 'Authorization' not in sent_headers[3]
+    assert client._tokens == {('quay.io', 'ns/repo', None): ('second', 1350)}
+
+
+@mock.patch('iib.workers.registry_client.time.monotonic')
+@mock.patch('iib.workers.registry_client._get_registry_credentials')
+def test_expired_tokens_pruned(mock_grc, mock_monotonic):
+    mock_grc.return_value = None
+    client = registry_client.RegistryClient()
+    client._tokens = {
+        ('quay.io', 'ns/old', None): ('old', 1100),
+        ('quay.io', 'ns/valid', None): ('valid', 1400),
+    }
+    session = mock.Mock()
+    session.get.side_effect = [
+        _response(401, headers={'WWW-Authenticate': _CHALLENGE}),
+        _response(json_data={'access_token': 'new'}),
+        _response(content=b'{"schemaVersion": 2}'),
+    ]
+    client.session = session
+    mock_monotonic.return_value = 1200
+
+    client.get_manifest('quay.io/ns/repo:v1')
+
+    assert client._tokens == {
+        ('quay.io', 'ns/valid', None): ('valid', 1400),
+        ('quay.io', 'ns/repo', None): ('new', 1250),
+    }
+
+
+@mock.patch('iib.workers.registry_client._get_registry_credentials')
+def test_get_config(mock_grc):
+    mock_grc.return_value = None
+    client = registry_client.RegistryClient()
+    manifest = {'schemaVersion': 2, 'config': {'digest': 'sha256:abc'}}
+    session = mock.Mock()
+    session.get.side_effect = [
+        _response(content=json.dumps(manifest).encode('utf-8')),
+        _response(content=b'{"config": {"Labels": {"a": "b"}}}'),
+    ]
+    client.session = session
+
+    assert client.get_config('docker://quay.io/ns/repo:v1') == '{"config": {"Labels": {"a": "b"}}}'
+    session.get.assert_called_with(
+        'https://quay.io/v2/ns/repo/blobs/sha256:abc', headers={}, timeout=300.0
+    )
+
+
+@pytest.mark.parametrize(
+    'manifest, error',
+    (
+        (b'{"schemaVersion": 2, "manifests": []}', 'is not a single arch v2 image manifest'),
+        (b'{"schemaVersion": 2, "config": "sha256:abc"}', 'is not a single arch v2 image manifest'),
+        (b'["schemaVersion"]', 'is not a single arch v2 image manifest'),
+        (b'<html>Service Unavailable</html>', 'The manifest of .+ is not valid JSON'),
+    ),
+)
+@mock.patch('iib.workers.registry_client._get_registry_credentials')
+def test_get_config_invalid_manifest(mock_grc, manifest, error):
+    mock_grc.return_value = None
+    client = registry_client.RegistryClient()
+    session = mock.Mock()
+    session.get.return_value = _response(content=manifest)
+    client.session = session
+
+    with pytest.raises(RegistryClientError, match=error):
+        client.get_config('quay.io/ns/repo:v1')
+
+
+@pytest.mark.parametrize(
+    'side_effect, error',
+    (
+        ([_response(404)], 'failed with the status 404'),
+        ([requests.ConnectionError('boom')], 'The connection to quay.io failed: boom'),
+        (
+            [_response(401, headers={'WWW-Authenticate': 'Negotiate'})],
+            'Unsupported authentication scheme on quay.io: Negotiate',
+        ),
+        (
+            [
+                _response(401, headers={'WWW-Authenticate': _CHALLENGE}),
+                _response(content=b'<html>Service Unavailable</html>'),
+            ],
+            'The authentication to quay.io returned invalid JSON',
+        ),
+        (
+            [
+                _response(401, headers={'WWW-Authenticate': _CHALLENGE}),
+                _response(json_data=['secret']),
+            ],
+            'The authentication to quay.io returned no token',
+        ),
+    ),
+)
+@mock.patch('iib.workers.registry_client._get_registry_credentials')
+def test_get_manifest_failure(mock_grc, side_effect, error):
+    mock_grc.return_value = None
+    client = registry_client.RegistryClient()
+    session = mock.Mock()
+    session.get.side_effect = side_effect
+    client.session = session
+
+    with pytest.raises(RegistryClientError, match=error):
+        client.get_manifest('quay.io/ns/repo:v1')
+
+
+def test_get_registry_credentials(tmpdir):
+    docker_dir = tmpdir.mkdir('.docker')
+    docker_dir.join('config.json').write(
+        json.dumps({'auths': {'quay.io': {'auth': 'dXNlcjpwYXNz'}}})
+    )
+
+    with mock.patch('os.path.expanduser', return_value=str(tmpdir)):
+        assert registry_client._get_registry_credentials('quay.io') == 'dXNlcjpwYXNz'
+        assert registry_client._get_registry_credentials('registry.example.com') is None
@@ -1,4 +1,5 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
+from concurrent.futures import Future
 import copy
 import os
 import re
@@ -36,7 +37,7 @@ def test_build_image(mock_run_cmd, mock_get_label, arch):
         [
             'buildah',
             'bud',
-            '--no-cache',
+            '--layers',
             '--format',
             'docker',
             '--override-arch',
@@ -90,6 +91,47 @@ def test_build_image_retry(mock_run_cmd):
     assert mock_run_cmd.call_count == worker_config.iib_total_attempts
 
 
+@mock.patch('iib.workers.tasks.build._push_image')
+@mock.patch('iib.workers.tasks.build._build_image')
+def test_build_and_push_arches(mock_bi, mock_pi):
+    arches = {'amd64', 's390x', 'ppc64le'}
+
+    build._build_and_push_arches('/some/dir', 'some.Dockerfile', 3, arches)
+
+    assert mock_bi.call_count == len(arches)
+    mock_bi.assert_has_calls(
+        [mock.call('/some/dir', 'some.Dockerfile', 3, arch) for arch in arches], any_order=True
+    )
+    assert mock_pi.call_count == len(arches)
+    mock_pi.assert_has_calls([mock.call(3, arch) for arch in arches], any_order=True)
+
+
+@mock.patch('iib.workers.tasks.build._push_image')
+@mock.patch('iib.workers.tasks.build._build_image')
+def test_build_and_push_arches_failure(mock_bi, mock_pi):
+    mock_bi.side_effect = IIBError('Failed to build the container image on the arch s390x')
+
+    with pytest.raises(IIBError, match='Failed to build the container image on the arch s390x'):
+        build._build_and_push_arches('/some/dir', 'some.Dockerfile', 3, {'amd64', 's390x'})
+
+    mock_pi.assert_not_called()
+
+
+@mock.patch('iib.workers.tasks.build.ThreadPoolExecutor')
+def test_build_and_push_arches_failure_cancels_pending(mock_tpe):
+    failed_future = Future()
+    failed_future.set_exception(IIBError('Failed to build the container image on the arch amd64'))
+    pending_future = Future()
+    mock_executor = mock_tpe.return_value
+    mock_executor.submit.side_effect = [failed_future, pending_future]
+
+    with pytest.raises(IIBError, match='Failed to build the container image on the arch amd64'):
+        build._build_and_push_arches('/some/dir', 'some.Dockerfile', 3, {'amd64', 's390x'})
+
+    assert pending_future.cancelled()
+    mock_executor.shutdown.assert_called_once_with(wait=True)
+
+
 @mock.patch('iib.workers.tasks.build.run_cmd')
 @mock.patch('iib.workers.tasks.build.reset_docker_config')
 def test_cleanup(mock_rdc, mock_run_cmd):
@@ -101,6 +143,59 @@ def test_cleanup(mock_rdc, mock_run_cmd):
     mock_rdc.assert_called_once_with()
 
 
+@mock.patch('iib.workers.tasks.build.get_worker_config')
+@mock.patch('iib.workers.tasks.build.run_cmd')
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
+def test_cleanup_preserve_cache(mock_rdc, mock_run_cmd, mock_gwc):
+    mock_gwc.return_value = {'iib_preserve_cache': True, 'iib_image_cache_max_age': '12h'}
+    mock_run_cmd.side_effect = [
+        textwrap.dedent(
+            '''\
+            localhost/iib-build:3-amd64
+            localhost/iib-build:3-s390x
+            localhost/iib-build:31-amd64
+            registry.example.com/binary-image:latest
+            <none>:<none>
+            '''
+        ),
+        None,
+        None,
+    ]
+
+    build._cleanup(3)
+
+    assert mock_run_cmd.mock_calls == [
+        mock.call(
+            ['podman', 'images', '--format', '{{.Repository}}:{{.Tag}}'],
+            exc_msg='Failed to list the existing container images',
+        ),
+        mock.call(
+            [
+                'podman',
+                'rmi',
+                '--force',
+                'localhost/iib-build:3-amd64',
+                'localhost/iib-build:3-s390x',
+            ],
+            exc_msg='Failed to remove the container images of the request 3',
+        ),
+        mock.call(
+            ['podman', 'image', 'prune', '--force', '--filter', 'until=12h'],
+            exc_msg='Failed to remove the stale container images',
+        ),
+    ]
+    mock_rdc.assert_called_once_with()
+
+
+@mock.patch('iib.workers.tasks.build.run_cmd')
+def test_remove_request_images_no_images(mock_run_cmd):
+    mock_run_cmd.return_value = 'localhost/iib-build:31-amd64\n'
+
+    build._remove_request_images(3)
+
+    mock_run_cmd.assert_called_once()
+
+
 @mock.patch('iib.workers.tasks.build.tempfile.TemporaryDirectory')
 @mock.patch('iib.workers.tasks.build.run_cmd')
 @mock.patch('iib.workers.tasks.build.open')
@@ -113,17 +208,13 @@ def test_create_and_push_manifest_list(mock_open, mock_run_cmd, mock_td, tmp_pat
         None,
         None,
         None,
-        None,
-        None,
-        None,
-        None,
-        None,
     ]
 
     output = []
     mock_open().__enter__().write.side_effect = lambda x: output.append(x)
-    build._create_and_push_manifest_list(3, {'amd64', 's390x'}, ['extra_build_tag1'])
+    rv = build._create_and_push_manifest_list(3, {'amd64', 's390x'}, ['extra_build_tag1'])
 
+    assert rv == 'registry:8443/iib-build:3'
     expected_calls = [
         mock.call(
             ['buildah', 'manifest', 'rm', 'registry:8443/iib-build:3'],
@@ -174,42 +265,6 @@ def test_create_and_push_manifest_list(mock_open, mock_run_cmd, mock_td, tmp_pat
             ],
             exc_msg='Failed to push the manifest list to registry:8443/iib-build:3',
         ),
-        mock.call(
-            ['buildah', 'manifest', 'rm', 'registry:8443/iib-build:extra_build_tag1'],
-            exc_msg='Failed to remove local manifest list. '
-            'registry:8443/iib-build:extra_build_tag1 does not exist',
-        ),
-        mock.call(
-            ['buildah', 'manifest', 'create', 'registry:8443/iib-build:extra_build_tag1'],
-            exc_msg='Failed to create the manifest list locally: '
-            'registry:8443/iib-build:extra_build_tag1',
-        ),
-        mock.call(
-            [
-                'buildah',
-                'manifest',
-                'add',
-                'registry:8443/iib-build:extra_build_tag1',
-                'docker://registry:8443/iib-build:3-amd64',
-            ],
-            exc_msg=(
-                'Failed to add docker://registry:8443/iib-build:3-amd64'
-                ' to the local manifest list: registry:8443/iib-build:extra_build_tag1'
-            ),
-        ),
-        mock.call(
-            [
-                'buildah',
-                'manifest',
-                'add',
-                'registry:8443/iib-build:extra_build_tag1',
-                'docker://registry:8443/iib-build:3-s390x',
-            ],
-            exc_msg=(
-                'Failed to add docker://registry:8443/iib-build:3-s390x'
-                ' to the local manifest list: registry:8443/iib-build:extra_build_tag1'
-            ),
-        ),
         mock.call(
             [
                 'buildah',
@@ -218,7 +273,7 @@ def test_create_and_push_manifest_list(mock_open, mock_run_cmd, mock_td, tmp_pat
                 '--all',
                 '--format',
                 'v2s2',
-                'registry:8443/iib-build:extra_build_tag1',
+                'registry:8443/iib-build:3',
                 'docker://registry:8443/iib-build:extra_build_tag1',
             ],
             exc_msg='Failed to push the manifest list to registry:8443/iib-build:extra_build_tag1',
@@ -329,6 +384,115 @@ def test_update_index_image_pull_spec(
         mock_ofi.assert_not_called()
 
 
+@mock.patch('iib.workers.tasks.build._cleanup')
+@mock.patch('iib.workers.tasks.build._update_index_image_pull_spec')
+@mock.patch('iib.workers.tasks.build._create_and_push_manifest_list')
+@mock.patch('iib.workers.tasks.build.set_request_state')
+def test_push_manifest_list_and_update_request(mock_srs, mock_capml, mock_uiips, mock_cleanup):
+    mock_capml.return_value = 'quay.io/namespace/some-image:3'
+    arches = {'amd64', 's390x'}
+
+    build._push_manifest_list_and_update_request(
+        3,
+        arches,
+        build_tags=['extra-tag'],
+        from_index='quay.io/ns/iib:v4.5',
+        overwrite_from_index=True,
+        overwrite_from_index_token='user:pass',
+        from_index_resolved='quay.io/ns/iib@sha256:abcdef',
+    )
+
+    mock_srs.assert_called_once_with(3, 'in_progress', 'Creating the manifest list')
+    mock_capml.assert_called_once_with(3, arches, ['extra-tag'])
+    mock_uiips.assert_called_once_with(
+        'quay.io/namespace/some-image:3',
+        3,
+        arches,
+        'quay.io/ns/iib:v4.5',
+        True,
+        'user:pass',
+        'quay.io/ns/iib@sha256:abcdef',
+        add_or_rm=True,
+    )
+    # The caller is responsible for removing the container images
+    mock_cleanup.assert_not_called()
+
+
+@mock.patch('iib.workers.tasks.build.get_worker_config')
+@mock.patch('iib.workers.tasks.build.update_request')
+@mock.patch('iib.workers.tasks.build.get_resolved_image')
+@mock.patch('iib.workers.tasks.build.set_registry_token')
+def test_update_index_image_pull_spec_same_image_resolved_once(
+    mock_srt, mock_gri, mock_ur, mock_gwc
+):
+    output_pull_spec = 'quay.io/namespace/some-image:3'
+    mock_gri.return_value = 'quay.io/namespace/some-image@sha256:abcdef1234'
+    mock_gwc.return_value = {'iib_index_image_output_registry': None, 'iib_registry': 'quay.io'}
+
+    build._update_index_image_pull_spec(output_pull_spec, 2, {'amd64'}, add_or_rm=True)
+
+    mock_gri.assert_called_once_with(output_pull_spec)
+    update_request_payload = mock_ur.call_args[0][1]
+    assert update_request_payload['index_image_resolved'] == mock_gri.return_value
+    assert update_request_payload['internal_index_image_copy_resolved'] == mock_gri.return_value
+
+
+@pytest.mark.parametrize(
+    'iib_index_image_output_registry, from_index, overwrite, expected_index_image',
+    (
+        ('registry-proxy.domain.local', None, False, 'registry-proxy.domain.local/ns/iib:3'),
+        (None, 'quay.io/user_ns/iib:v4.5', True, 'quay.io/user_ns/iib:v4.5'),
+    ),
+)
+@mock.patch('iib.workers.tasks.build.get_worker_config')
+@mock.patch('iib.workers.tasks.build._overwrite_from_index')
+@mock.patch('iib.workers.tasks.build.update_request')
+@mock.patch('iib.workers.tasks.build.get_resolved_image')
+@mock.patch('iib.workers.tasks.build.set_registry_token')
+def test_update_index_image_pull_spec_different_images_resolved(
+    mock_srt,
+    mock_gri,
+    mock_ur,
+    mock_ofi,
+    mock_gwc,
+    iib_index_image_output_registry,
+    from_index,
+    overwrite,
+    expected_index_image,
+):
+    output_pull_spec = 'quay.io/ns/iib:3'
+    digests = {
+        expected_index_image: 'quay.io/user_ns/iib@sha256:index',
+        output_pull_spec: 'quay.io/ns/iib@sha256:output',
+    }
+    mock_gri.side_effect = lambda pull_spec: digests[pull_spec]
+    mock_gwc.return_value = {
+        'iib_index_image_output_registry': iib_index_image_output_registry,
+        'iib_registry': 'quay.io',
+    }
+
+    build._update_index_image_pull_spec(
+        output_pull_spec,
+        2,
+        {'amd64'},
+        from_index,
+        overwrite,
+        'user:pass',
+        resolved_prebuild_from_index='quay.io/user_ns/iib@sha256:abcdef',
+        add_or_rm=True,
+    )
+
+    assert mock_gri.call_count == 2
+    update_request_payload = mock_ur.call_args[0][1]
+    assert update_request_payload['index_image'] == expected_index_image
+    assert update_request_payload['index_image_resolved'] == 'quay.io/user_ns/iib@sha256:index'
+    assert update_request_payload['internal_index_image_copy'] == output_pull_spec
+    assert (
+        update_request_payload['internal_index_image_copy_resolved']
+        == 'quay.io/ns/iib@sha256:output'
+    )
+
+
 @pytest.mark.parametrize('request_id, arch', ((1, 'amd64'), (5, 's390x')))
 def test_get_local_pull_spec(request_id, arch):
     rv = build._get_local_pull_spec(request_id, arch)
@@ -441,27 +605,46 @@ def test_update_index_image_build_state(mock_ur, bundle_mapping, from_index_reso
     mock_ur.assert_called_once_with(request_id, expected_payload, mock.ANY)
 
 
-@pytest.mark.parametrize('schema_version', (1, 2))
-@mock.patch('iib.workers.tasks.build._get_local_pull_spec')
 @mock.patch('iib.workers.tasks.build.run_cmd')
-@mock.patch('iib.workers.tasks.build.skopeo_inspect')
-@mock.patch('iib.workers.tasks.build._skopeo_copy')
-def test_push_image(mock_sc, mock_si, mock_run_cmd, mock_glps, schema_version):
-    mock_glps.return_value = 'source:tag'
-    mock_si.return_value = {'schemaVersion': schema_version}
-
+def test_push_image(mock_run_cmd):
     build._push_image(3, 'amd64')
 
+    mock_run_cmd.assert_called_once()
     push_args = mock_run_cmd.mock_calls[0][1][0]
-    assert push_args[0:2] == ['podman', 'push']
-    assert 'source:tag' in push_args
-    destination = 'docker://registry:8443/iib-build:3-amd64'
-    assert destination in push_args
+    assert push_args == [
+        'skopeo',
+        '--command-timeout',
+        '300s',
+        'copy',
+        '--format',
+        'v2s2',
+        'containers-storage:localhost/iib-build:3-amd64',
+        'docker://registry:8443/iib-build:3-amd64',
+    ]
 
-    if schema_version == 1:
-        mock_sc.assert_called_once()
-    else:
-        mock_run_cmd.assert_called_once()
+
+@mock.patch('iib.workers.tasks.build.get_worker_config')
+@mock.patch('iib.workers.tasks.build.run_cmd')
+def test_push_image_compression_level(mock_run_cmd, mock_gwc):
+    mock_gwc.return_value = {
+        'iib_image_push_template': '{registry}/iib-build:{request_id}',
+        'iib_registry': 'registry:8443',
+        'iib_skopeo_timeout': '300s',
+        'iib_use_registry_client': False,
+        'iib_push_compression_level': 1,
+    }
+
+    build._push_image(3, 'amd64')
+
+    push_args = mock_run_cmd.mock_calls[0][1][0]
+    assert push_args[4:] == [
+        '--format',
+        'v2s2',
+        '--dest-compress-level',
+        '1',
+        'containers-storage:localhost/iib-build:3-amd64',
+        'docker://registry:8443/iib-build:3-amd64',
+    ]
 
 
 @pytest.mark.parametrize('copy_all', (False, True))
@@ -521,6 +704,7 @@ def test_buildah_fail_max_retries(mock_run_cmd: mock.MagicMock) -> None:
 )
 @pytest.mark.parametrize('distribution_scope', ('dev', 'stage', 'prod'))
 @pytest.mark.parametrize('deprecate_bundles', (True, False))
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
 @mock.patch('iib.workers.tasks.utils.run_cmd')
 @mock.patch('iib.workers.tasks.utils.opm_registry_serve')
 @mock.patch('iib.workers.tasks.build.deprecate_bundles')
@@ -538,7 +722,7 @@ def test_buildah_fail_max_retries(mock_run_cmd: mock.MagicMock) -> None:
 @mock.patch('iib.workers.tasks.build.set_request_state')
 @mock.patch('iib.workers.tasks.build._create_and_push_manifest_list')
 @mock.patch('iib.workers.tasks.build.gate_bundles')
-@mock.patch('iib.workers.tasks.build.get_resolved_bundles')
+@mock.patch('iib.workers.tasks.build.get_resolved_bundles_mapping')
 @mock.patch('iib.workers.tasks.build._add_label_to_index')
 @mock.patch('iib.workers.tasks.build._get_present_bundles')
 @mock.patch('iib.workers.tasks.build.set_registry_token')
@@ -568,6 +752,7 @@ def test_handle_add_request(
     mock_dep_b,
     mock_ors,
     mock_run_cmd,
+    mock_rdc,
     force_backport,
     binary_image,
     distribution_scope,
@@ -585,7 +770,10 @@ def test_handle_add_request(
         'ocp_version': 'v4.5',
         'distribution_scope': distribution_scope,
     }
-    mock_grb.return_value = ['some-bundle@sha256:123', 'some-deprecation-bundle@sha256:456']
+    mock_grb.return_value = {
+        'some-bundle:2.3-1': 'some-bundle@sha256:123',
+        'some-deprecation-bundle:1.1-1': 'some-deprecation-bundle@sha256:456',
+    }
     output_pull_spec = 'quay.io/namespace/some-image:3'
     mock_capml.return_value = output_pull_spec
     mock_gpb.return_value = [{'bundlePath': 'random_bundle@sha256:678'}], [
@@ -697,10 +885,11 @@ def test_handle_add_request(
         mock_dep_b.assert_not_called()
 
 
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
 @mock.patch('iib.workers.tasks.build._cleanup')
 @mock.patch('iib.workers.tasks.build.run_cmd')
 @mock.patch('iib.workers.tasks.build.is_image_fbc')
-def test_handle_add_request_raises(mock_iifbc, mock_runcmd, mock_c):
+def test_handle_add_request_raises(mock_iifbc, mock_runcmd, mock_c, mock_rdc):
     mock_iifbc.return_value = True
     with pytest.raises(IIBError):
         build.handle_add_request(
@@ -721,6 +910,7 @@ def test_handle_add_request_raises(mock_iifbc, mock_runcmd, mock_c):
         )
 
 
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
 @mock.patch('iib.workers.tasks.build.get_worker_config')
 @mock.patch('iib.workers.tasks.utils.sqlite3.connect')
 @mock.patch('iib.workers.tasks.utils.run_cmd')
@@ -739,7 +929,7 @@ def test_handle_add_request_raises(mock_iifbc, mock_runcmd, mock_c):
 @mock.patch('iib.workers.tasks.build.set_request_state')
 @mock.patch('iib.workers.tasks.build._create_and_push_manifest_list')
 @mock.patch('iib.workers.tasks.build.gate_bundles')
-@mock.patch('iib.workers.tasks.build.get_resolved_bundles')
+@mock.patch('iib.workers.tasks.build.get_resolved_bundles_mapping')
 @mock.patch('iib.workers.tasks.build._add_label_to_index')
 @mock.patch('iib.workers.tasks.build._get_present_bundles')
 @mock.patch('iib.workers.tasks.build.set_registry_token')
@@ -770,6 +960,7 @@ def test_handle_add_request_check_index_label_behavior(
     mock_run_cmd,
     mock_sqlite,
     mock_gwc,
+    mock_rdc,
 ):
     arches = {'amd64', 's390x'}
     binary_image_config = {'prod': {'v4.5': 'some_image'}}
@@ -783,7 +974,10 @@ def test_handle_add_request_check_index_label_behavior(
         'ocp_version': 'v4.5',
         'distribution_scope': 'stage',
     }
-    mock_grb.return_value = ['some-bundle@sha256:123', 'some-deprecation-bundle@sha256:456']
+    mock_grb.return_value = {
+        'some-bundle:2.3-1': 'some-bundle@sha256:123',
+        'some-deprecation-bundle:1.1-1': 'some-deprecation-bundle@sha256:456',
+    }
     output_pull_spec = 'quay.io/namespace/some-image:3'
     mock_capml.return_value = output_pull_spec
     mock_gpb.return_value = [{'bundlePath': 'random_bundle@sha256:678'}], [
@@ -895,19 +1089,20 @@ def test_handle_add_request_check_index_label_behavior(
     assert mock_alti.call_count == 2
 
 
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
 @mock.patch('iib.workers.tasks.build._cleanup')
 @mock.patch('iib.workers.tasks.build.set_request_state')
 @mock.patch('iib.workers.tasks.utils.set_request_state')
 @mock.patch('iib.workers.tasks.build.gate_bundles')
 @mock.patch('iib.workers.tasks.build.verify_labels')
-@mock.patch('iib.workers.tasks.build.get_resolved_bundles')
+@mock.patch('iib.workers.tasks.build.get_resolved_bundles_mapping')
 @mock.patch('iib.workers.tasks.opm_operations.Opm.set_opm_version')
 def test_handle_add_request_gating_failure(
-    mock_sov, mock_grb, mock_vl, mock_gb, mock_srs, mock_srs2, mock_cleanup
+    mock_sov, mock_grb, mock_vl, mock_gb, mock_srs, mock_srs2, mock_cleanup, mock_rdc
 ):
     error_msg = 'Gating failure!'
     mock_gb.side_effect = IIBError(error_msg)
-    mock_grb.return_value = ['some-bundle@sha']
+    mock_grb.return_value = {'some-bundle:2.3-1': 'some-bundle@sha'}
     bundles = ['some-bundle:2.3-1']
     cnr_token = 'token'
     organization = 'org'
@@ -927,18 +1122,22 @@ def test_handle_add_request_gating_failure(
             None,
             greenwave_config,
         )
-    assert mock_cleanup.call_count == 1
+    mock_rdc.assert_called_once_with()
+    mock_cleanup.assert_not_called()
     mock_srs2.assert_called_once()
     mock_vl.assert_called_once()
     mock_gb.assert_called_once_with(['some-bundle@sha'], greenwave_config)
     assert mock_sov.call_count == 0
 
 
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
 @mock.patch('iib.workers.tasks.build._cleanup')
 @mock.patch('iib.workers.tasks.build.set_request_state')
-@mock.patch('iib.workers.tasks.build.get_resolved_bundles')
+@mock.patch('iib.workers.tasks.build.get_resolved_bundles_mapping')
 @mock.patch('iib.workers.tasks.opm_operations.Opm.set_opm_version')
-def test_handle_add_request_bundle_resolution_failure(mock_sov, mock_grb, mock_srs, mock_cleanup):
+def test_handle_add_request_bundle_resolution_failure(
+    mock_sov, mock_grb, mock_srs, mock_cleanup, mock_rdc
+):
     error_msg = 'Bundle Resolution failure!'
     mock_grb.side_effect = IIBError(error_msg)
     bundles = ['some-bundle:2.3-1']
@@ -959,13 +1158,15 @@ def test_handle_add_request_bundle_resolution_failure(mock_sov, mock_grb, mock_s
             None,
             greenwave_config=greenwave_config,
         )
-    assert mock_cleanup.call_count == 1
+    mock_rdc.assert_called_once_with()
+    mock_cleanup.assert_not_called()
     mock_srs.assert_called_once()
     mock_grb.assert_called_once_with(bundles)
     assert mock_sov.call_count == 0
 
 
 @pytest.mark.parametrize('binary_image', ('binary-image:latest', None))
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
 @mock.patch('iib.workers.tasks.build._cleanup')
 @mock.patch('iib.workers.tasks.build.prepare_request_for_build')
 @mock.patch('iib.workers.tasks.build._update_index_image_build_state')
@@ -995,6 +1196,7 @@ def test_handle_rm_request(
     mock_oir,
     mock_prfb,
     mock_cleanup,
+    mock_rdc,
     binary_image,
 ):
     arches = {'amd64', 's390x'}
@@ -1041,6 +1243,7 @@ def test_handle_rm_request(
     assert mock_srs.call_args[0][1] == 'complete'
 
 
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
 @mock.patch('iib.workers.tasks.build._cleanup')
 @mock.patch('iib.workers.tasks.build.prepare_request_for_build')
 @mock.patch('iib.workers.tasks.build._update_index_image_build_state')
@@ -1086,6 +1289,7 @@ def test_handle_rm_request_fbc(
     mock_uiibs,
     mock_prfb,
     mock_c,
+    mock_rdc,
 ):
     mock_iifbc.return_value = True
     from_index_resolved = 'from-index@sha256:bcdefg'
@@ -1374,18 +1578,19 @@ def test_inspect_related_images_fail(mock_gil, mock_cffi, mock_fd, mock_gbd, moc
     ]
 
 
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
 @mock.patch('iib.workers.tasks.build._cleanup')
 @mock.patch('iib.workers.tasks.build.set_request_state')
-@mock.patch('iib.workers.tasks.build.get_resolved_bundles')
+@mock.patch('iib.workers.tasks.build.get_resolved_bundles_mapping')
 @mock.patch('iib.workers.tasks.build.verify_labels')
 @mock.patch('iib.workers.tasks.build.inspect_related_images')
 @mock.patch('iib.workers.tasks.opm_operations.Opm.set_opm_version')
 def test_handle_add_request_check_related_images_fail(
-    mock_sov, mock_iri, mock_vl, mock_grb, mock_srs, mock_cleanup
+    mock_sov, mock_iri, mock_vl, mock_grb, mock_srs, mock_cleanup, mock_rdc
 ):
     bundles = ['some-bundle:2.3-1']
     error_msg = 'IIB cannot access the following related images [quay.io/related/image@sha256:1]'
-    mock_grb.return_value = ['some-bundle@sha256:123']
+    mock_grb.return_value = {'some-bundle:2.3-1': 'some-bundle@sha256:123'}
     mock_iri.side_effect = IIBError(error_msg)
     with pytest.raises(IIBError, match=re.escape(error_msg)):
         build.handle_add_request(
@@ -1407,7 +1612,8 @@ def test_handle_add_request_check_related_images_fail(
             graph_update_mode=None,
             check_related_images=True,
         )
-    assert mock_cleanup.call_count == 1
+    mock_rdc.assert_called_once_with()
+    mock_cleanup.assert_not_called()
     mock_srs.assert_called_once()
     mock_grb.assert_called_once_with(bundles)
     mock_vl.assert_called_once()
@@ -4,7 +4,7 @@ from unittest import mock
 import pytest
 
 from iib.exceptions import IIBError
-from iib.workers.tasks import general
+from iib.workers.tasks import build, general
 
 
 @pytest.mark.parametrize(
@@ -14,9 +14,38 @@ from iib.workers.tasks import general
         (RuntimeError('I cannot run in the rain!'), 'An unknown error occurred'),
     ),
 )
-@mock.patch('iib.workers.tasks.general._cleanup')
+@mock.patch('iib.workers.tasks.general._remove_request_images')
+@mock.patch('iib.workers.tasks.general.reset_docker_config')
 @mock.patch('iib.workers.tasks.general.set_request_state')
-def test_failed_request_callback(mock_srs, mock_cleanup, exc, expected_msg):
+def test_failed_request_callback(mock_srs, mock_rdc, mock_rri, exc, expected_msg):
     general.failed_request_callback(None, exc, None, 3)
     mock_srs(3, expected_msg)
-    mock_cleanup.assert_called_once()
+    mock_rri.assert_called_once_with(3)
+    mock_rdc.assert_called_once_with()
+
+
+@mock.patch('iib.workers.tasks.general.reset_docker_config')
+@mock.patch('iib.workers.tasks.general.set_request_state')
+@mock.patch('iib.workers.tasks.build.reset_docker_config')
+@mock.patch('iib.workers.tasks.build.set_request_state')
+@mock.patch('iib.workers.tasks.build.verify_labels')
+@mock.patch('iib.workers.tasks.build.get_resolved_bundles_mapping')
+@mock.patch('iib.workers.tasks.build.run_cmd')
+def test_failed_add_request_keeps_image_cache(
+    mock_run_cmd, mock_grbm, mock_vl, mock_srs, mock_rdc, mock_general_srs, mock_general_rdc
+):
+    error = IIBError('The bundle is missing the required labels')
+    mock_grbm.return_value = {'some-bundle:2.3-1': 'some-bundle@sha'}
+    mock_vl.side_effect = error
+    mock_run_cmd.return_value = 'localhost/iib-build:3-amd64\nregistry.example.com/opm:v4.12\n'
+
+    with pytest.raises(IIBError, match='The bundle is missing the required labels'):
+        build.handle_add_request(['some-bundle:2.3-1'], 3, 'binary-image:latest')
+    general.failed_request_callback(None, error, None, 3)
+
+    commands = [call[0][0] for call in mock_run_cmd.call_args_list]
+    assert ['podman', 'rmi', '--all', '--force'] not in commands
+    assert ['podman', 'rmi', '--force', 'localhost/iib-build:3-amd64'] in commands
+    mock_general_srs.assert_called_once_with(
+        3, 'failed', 'The bundle is missing the required labels'
+    )
@@ -7,7 +7,7 @@ from unittest import mock
 
 import pytest
 
-from iib.exceptions import ExternalServiceError, IIBError
+from iib.exceptions import ExternalServiceError, IIBError, RegistryClientError
 from iib.workers.config import get_worker_config
 from iib.workers.tasks import utils
 
@@ -401,6 +401,36 @@ def test_skopeo_inspect(mock_run_cmd):
     assert skopeo_args == expected
 
 
+@pytest.mark.parametrize(
+    'args, client_rv, expect_skopeo',
+    (
+        (('docker://quay.io/ns/repo:v1', '--raw'), '{"schemaVersion": 2}', False),
+        (('docker://quay.io/ns/repo:v1', '--config'), '{"schemaVersion": 2}', False),
+        (('docker://quay.io/ns/repo:v1', '--raw'), RegistryClientError('no'), True),
+        (('docker://quay.io/ns/repo:v1',), None, True),
+    ),
+)
+@mock.patch('iib.workers.tasks.utils.registry_client')
+@mock.patch('iib.workers.tasks.utils.get_worker_config')
+@mock.patch('iib.workers.tasks.utils.run_cmd')
+def test_skopeo_inspect_registry_client(
+    mock_run_cmd, mock_gwc, mock_rc, args, client_rv, expect_skopeo
+):
+    mock_gwc.return_value = mock.Mock(iib_skopeo_timeout='300s', iib_use_registry_client=True)
+    mock_rc.get_manifest.side_effect = [client_rv]
+    mock_rc.get_config.side_effect = [client_rv]
+    mock_run_cmd.return_value = '{"schemaVersion": 2}'
+
+    assert utils.skopeo_inspect(*args) == {'schemaVersion': 2}
+
+    if expect_skopeo:
+        mock_run_cmd.assert_called_once_with(
+            ['skopeo', '--command-timeout', '300s', 'inspect'] + list(args), exc_msg=mock.ANY
+        )
+    else:
+        mock_run_cmd.assert_not_called()
+
+
 @mock.patch('iib.workers.tasks.utils.run_cmd')
 def test_podman_pull(mock_run_cmd):
     image = 'some-image:latest'
@@ -655,6 +685,23 @@ def test_get_resolved_bundles_success(mock_si, mock_gri, skopeo_inspect_rv, expe
     assert response == expected_response
 
 
+@mock.patch('iib.workers.tasks.utils.get_resolved_image')
+@mock.patch('iib.workers.tasks.utils.skopeo_inspect')
+def test_get_resolved_bundles_mapping(mock_si, mock_gri):
+    mock_si.return_value = {
+        'mediaType': 'application/vnd.docker.distribution.manifest.v2+json',
+        'schemaVersion': 2,
+    }
+    mock_gri.return_value = 'some_bundle@manifest_digest'
+
+    response = utils.get_resolved_bundles_mapping(['some_bundle:1.2', 'some_bundle:latest'])
+
+    assert response == {
+        'some_bundle:1.2': 'some_bundle@manifest_digest',
+        'some_bundle:latest': 'some_bundle@manifest_digest',
+    }
+
+
 @mock.patch('iib.workers.tasks.utils.skopeo_inspect')
 def test_get_resolved_bundles_failure(mock_si):
     skopeo_inspect_rv = {
@@ -769,6 +816,35 @@ def test_get_image_arches_manifest(mock_si):
     ]
     rv = utils.get_image_arches('image:latest')
     assert rv == {'amd64'}
+    mock_si.assert_called_with('docker://image:latest', '--config')
+
+
+@pytest.mark.parametrize(
+    'blob, client_error',
+    (
+        ('{"architecture": "s390x"}', False),
+        (RegistryClientError('no'), True),
+        ('<html>Service Unavailable</html>', True),
+    ),
+)
+@mock.patch('iib.workers.tasks.utils.registry_client')
+@mock.patch('iib.workers.tasks.utils.get_worker_config')
+@mock.patch('iib.workers.tasks.utils.skopeo_inspect')
+def test_get_image_arches_manifest_registry_client(mock_si, mock_gwc, mock_rc, blob, client_error):
+    mock_gwc.return_value = mock.Mock(iib_use_registry_client=True)
+    mock_si.side_effect = [
+        {
+            'mediaType': 'application/vnd.docker.distribution.manifest.v2+json',
+            'config': {'digest': 'sha256:abc'},
+        },
+        {'architecture': 's390x'},
+    ]
+    mock_rc.get_blob.side_effect = [blob]
+
+    assert utils.get_image_arches('quay.io/ns/image:latest') == {'s390x'}
+
+    mock_rc.get_blob.assert_called_once_with('docker://quay.io/ns/image:latest', 'sha256:abc')
+    assert mock_si.call_count == (2 if client_error else 1)
 
 
 @mock.patch('iib.workers.tasks.utils.skopeo_inspect')
@@ -801,6 +877,38 @@ def test_verify_labels(mock_gil, mock_gwc, iib_required_labels):
         mock_gil.assert_not_called()
 
 
+@mock.patch('iib.workers.tasks.utils.get_worker_config')
+@mock.patch('iib.workers.tasks.utils.get_image_labels')
+def test_verify_labels_returns_labels(mock_gil, mock_gwc):
+    mock_gwc.return_value = {'iib_required_labels': {'com.redhat.delivery.operator.bundle': 'true'}}
+    mock_gil.return_value = {'com.redhat.delivery.operator.bundle': 'true', 'a': 'b'}
+
+    assert utils.verify_labels(['some-bundle@sha256:123']) == {
+        'some-bundle@sha256:123': {'com.redhat.delivery.operator.bundle': 'true', 'a': 'b'}
+    }
+
+
+@mock.patch('iib.workers.tasks.utils.get_image_labels')
+def test_get_images_labels(mock_gil):
+    mock_gil.side_effect = lambda pull_spec: {'name': pull_spec.split(':', 1)[0]}
+
+    rv = utils.get_images_labels(['some-bundle:v1.0', 'other-bundle:v1.0', 'some-bundle:v1.0'])
+
+    assert rv == {
+        'some-bundle:v1.0': {'name': 'some-bundle'},
+        'other-bundle:v1.0': {'name': 'other-bundle'},
+    }
+    assert mock_gil.call_count == 2
+
+
+@mock.patch('iib.workers.tasks.utils.get_image_labels')
+def test_get_images_labels_failure(mock_gil):
+    mock_gil.side_effect = IIBError('Failed to inspect docker://some-bundle:v1.0')
+
+    with pytest.raises(IIBError, match='Failed to inspect docker://some-bundle:v1.0'):
+        utils.get_images_labels(['some-bundle:v1.0'])
+
+
 @mock.patch('iib.workers.tasks.utils.get_worker_config')
 @mock.patch('iib.workers.tasks.utils.get_image_labels')
 def test_verify_labels_fails(mock_gil, mock_gwc):
@@ -875,7 +983,7 @@ def test_verify_labels_fails(mock_gil, mock_gwc):
 @mock.patch('iib.workers.tasks.utils.set_request_state')
 @mock.patch('iib.workers.tasks.utils.get_resolved_image')
 @mock.patch('iib.workers.tasks.utils.get_image_arches')
-@mock.patch('iib.workers.tasks.utils.get_image_label')
+@mock.patch('iib.workers.tasks.utils.get_image_labels')
 @mock.patch('iib.workers.tasks.build.update_request')
 def test_prepare_request_for_build(
     mock_ur,
@@ -898,7 +1006,7 @@ def test_prepare_request_for_build(
     from_index_resolved = None
     expected_arches = set(add_arches) | from_index_arches
     expected_payload_keys = {'binary_image_resolved', 'state', 'state_reason'}
-    gil_side_effect = []
+    images_labels = {}
     ocp_version = 'v4.5'
     if expected_bundle_mapping:
         expected_payload_keys.add('bundle_mapping')
@@ -909,19 +1017,24 @@ def test_prepare_request_for_build(
         mock_gri.side_effect = [from_index_resolved, binary_image_resolved, index_resolved]
         mock_gia.side_effect = [from_index_arches, expected_arches]
         expected_payload_keys.add('from_index_resolved')
-        gil_side_effect = ['v4.6', resolved_distribution_scope]
+        images_labels[from_index_resolved] = {
+            'com.redhat.index.delivery.version': 'v4.6',
+            'com.redhat.index.delivery.distribution_scope': resolved_distribution_scope,
+        }
         ocp_version = 'v4.6'
     else:
         index_resolved = f'index-image@sha256:abcdef1234'
         mock_gri.side_effect = [binary_image_resolved, index_resolved]
         mock_gia.side_effect = [expected_arches]
-        gil_side_effect = []
 
-    if bundles:
-        bundle_side_effects = [bundle.rsplit('/', 1)[1].split(':', 1)[0] for bundle in bundles]
-        gil_side_effect.extend(bundle_side_effects)
+    for bundle in bundles or []:
+        images_labels[bundle] = {
+            'operators.operatorframework.io.bundle.package.v1': (
+                bundle.rsplit('/', 1)[1].split(':', 1)[0]
+            )
+        }
 
-    mock_gil.side_effect = gil_side_effect
+    mock_gil.side_effect = lambda pull_spec: images_labels[pull_spec]
 
     rv = utils.prepare_request_for_build(
         1,
@@ -1007,6 +1120,38 @@ def test_prepare_request_for_build_merge_index_img(mock_gia, mock_gri, mock_giii
     }
 
 
+@mock.patch('iib.workers.tasks.utils.set_request_state')
+@mock.patch('iib.workers.tasks.utils.get_resolved_image')
+@mock.patch('iib.workers.tasks.utils.get_image_arches')
+@mock.patch('iib.workers.tasks.utils.get_image_labels')
+def test_prepare_request_for_build_known_bundles_labels(mock_gil, mock_gia, mock_gri, mock_srs):
+    mock_gri.side_effect = ['binary-image@sha256:abcdef', 'index-image@sha256:abcdef1234']
+    mock_gia.side_effect = [{'amd64'}]
+    mock_gil.return_value = {'operators.operatorframework.io.bundle.package.v1': 'other-bundle'}
+    bundles = ['quay.io/some-bundle:v1', 'quay.io/other-bundle:v1']
+
+    rv = utils.prepare_request_for_build(
+        1,
+        utils.RequestConfigAddRm(
+            _binary_image='binary-image:latest',
+            add_arches=['amd64'],
+            bundles=bundles,
+            bundles_labels={
+                'quay.io/some-bundle:v1': {
+                    'operators.operatorframework.io.bundle.package.v1': 'some-bundle'
+                }
+            },
+        ),
+    )
+
+    assert rv['bundle_mapping'] == {
+        'some-bundle': ['quay.io/some-bundle:v1'],
+        'other-bundle': ['quay.io/other-bundle:v1'],
+    }
+    # Only the bundle with unknown labels is inspected
+    mock_gil.assert_called_once_with('quay.io/other-bundle:v1')
+
+
 @mock.patch('iib.workers.tasks.utils.set_request_state')
 @mock.patch('iib.workers.tasks.utils.get_resolved_image')
 @mock.patch('iib.workers.tasks.utils.get_image_arches')